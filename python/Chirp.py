@@ -0,0 +1,124 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Chirp generates a linear FM sweep.
+
+The delta phase of element u of a sweep is dp + ddp*u, so its phase is the
+closed form quadratic dp*u + ddp*u*u/2, evaluated for a whole packet at
+once. A sweep lasts length elements; it then starts over from dp (repeat)
+or sweeps back down to dp (pingpong). The phase is continuous from packet
+to packet and from one sweep to the next.
+'''
+import math
+import numpy as np
+
+class Chirp:
+    TWOPI = math.pi * 2.0
+
+    def __init__(self):
+        self.start(0.0)
+
+    # Start a new sweep
+    # @param p Phase of the first element
+    def start(self, p):
+        # Phase at the start of the current sweep, and position of the next
+        # element in it
+        self.base = p
+        self.position = 0.0
+
+    # Phase of elements relative to the start of their sweep cycle
+    # @param u        Position of the elements in the cycle
+    # @param dp       Delta Phase at the start of the sweep
+    # @param ddp      Change of the Delta Phase per element
+    # @param length   Number of elements in one sweep
+    # @param pingpong Sweep back down after each sweep up
+    def cycle_phase(self, u, dp, ddp, length, pingpong):
+        phase = dp*u + 0.5*ddp*u*u
+        if pingpong:
+            # Past the top of the sweep, mirror it: the phase gained on the
+            # way down equals the phase gained on the way up
+            v = u - length
+            down = v >= 0
+            if np.any(down):
+                v = v[down]
+                top = dp*length + 0.5*ddp*length*length
+                phase[down] = top + (dp + ddp*length)*v - 0.5*ddp*v*v
+        return phase
+
+    # Phase gained in one full sweep cycle
+    def cycle(self, dp, ddp, length, pingpong):
+        up = dp*length + 0.5*ddp*length*length
+        return 2*up if pingpong else up
+
+    # Create a CHIRP array of given amplitude
+    # @param amp      Amplitude
+    # @param dp       Delta Phase at the start of the sweep
+    # @param ddp      Change of the Delta Phase per element
+    # @param length   Number of elements in one sweep, > 0
+    # @param pingpong Sweep back down after each sweep up, instead of
+    #                 starting over
+    # @param n        Number of elements
+    # @param spa      Scalars per atom, 2 for Complex (cosine, sine)
+    # @param out      Optional float32 array to write the data to
+    # @return a contiguous float32 ndarray
+    def chirp(self, amp, dp, ddp, length, pingpong, n, spa, out=None):
+        if out is None:
+            out = np.empty(n*abs(spa), dtype=np.float32)
+        elif len(out) != n*abs(spa):
+            raise ValueError("output array has %d elements, expected %d" % (len(out), n*abs(spa)))
+
+        # Split the elements into sweep cycles; each cycle starts where the
+        # phase gained over the cycles before it left off
+        period = 2*length if pingpong else length
+        cycle = self.cycle(dp, ddp, length, pingpong) % 1.0
+        t = np.arange(n, dtype=np.float64)
+        t += self.position
+        index = np.floor(t/period)
+        t -= index*period
+        phase = self.cycle_phase(t, dp, ddp, length, pingpong)
+        index *= cycle
+        phase += index
+        phase += self.base
+
+        self.advance(dp, ddp, length, pingpong, n)
+
+        phase -= np.floor(phase)
+        phase *= self.TWOPI
+        if abs(spa) == 2:
+            out[0::2] = amp*np.cos(phase)
+            out[1::2] = amp*np.sin(phase)
+        else:
+            np.sin(phase, out=phase)
+            phase *= amp
+            out[:] = phase
+        return out
+
+    # Move the sweep past elements without generating them
+    # @param n Number of elements
+    def advance(self, dp, ddp, length, pingpong, n):
+        period = 2*length if pingpong else length
+        cycle = self.cycle(dp, ddp, length, pingpong) % 1.0
+        end = self.position + n
+        cycles = math.floor(end/period)
+        self.base = (self.base + cycles*cycle) % 1.0
+        self.position = end - cycles*period
+
+    # Get the phase of the next element
+    def get_phase(self, dp, ddp, length, pingpong):
+        u = np.array([self.position])
+        return float((self.base + self.cycle_phase(u, dp, ddp, length, pingpong)[0]) % 1.0)
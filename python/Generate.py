@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Generate writes the output of SigGen to files, unthrottled and without
+CORBA, to make test vectors:
+
+    Generate.py --shape chirp --sample_rate 1e6 --seconds 10 \
+        --format blue --type short chirp.tmp
+
+The options are the properties of the component, and the packets are
+generated with Stream, so the files hold what the component would push.
+Each channel goes to its own file: the output path, with the index of the
+channel before the extension when there are several. The files are raw
+float32 or int16 scalars, interleaved I and Q for complex output, or type
+1000 BLUE files of the same data. The achieved rate is reported on stderr.
+'''
+import argparse
+import io
+import os
+import struct
+import sys
+import time
+import numpy as np
+import Packet
+import Stream
+
+# Size of the writes to the files, in bytes
+BUFFER_SIZE = 4*1024*1024
+
+# Seconds from the Midas epoch, 1950-01-01, to the Unix epoch
+MIDAS_EPOCH = 631152000.0
+
+# Size of the header of a BLUE file, the data follows it
+BLUE_HEADER_SIZE = 512
+
+# Data types of the files, by name, and their BLUE format codes
+TYPES = {"float": (np.float32, "F"),
+         "short": (np.int16, "I")}
+
+# Create the header of a type 1000 BLUE file
+# @param sri   The SRI of the stream
+# @param start Time of the first element, a Stream.Time
+# @param count Number of elements in the file
+# @param name  Type of the scalars, a key of TYPES
+# @return the header, BLUE_HEADER_SIZE bytes
+def blue_header(sri, start, count, name):
+    dtype, code = TYPES[name]
+    spa = sri.mode + 1
+    keywords = "".join("%s=%s\0" % item for item in sorted(sri.keywords.items()))
+    if len(keywords) > 92:
+        keywords = ""
+    header = bytearray(BLUE_HEADER_SIZE)
+    struct.pack_into("<4s4s4siiiiidd", header, 0, "BLUE", "EEEI", "EEEI", 0, 0, 0, 0, 0,
+                     float(BLUE_HEADER_SIZE), float(count*spa*np.dtype(dtype).itemsize))
+    struct.pack_into("<i2shd", header, 48, 1000, ("C" if spa == 2 else "S") + code, 0,
+                     start.seconds() + MIDAS_EPOCH)
+    struct.pack_into("<i92s", header, 160, len(keywords), keywords)
+    # Adjunct header: xstart, xdelta and xunits
+    struct.pack_into("<ddi", header, 256, sri.xstart, sri.xdelta, sri.xunits)
+    return bytes(header)
+
+# Parse a boolean option
+def boolean(text):
+    if text.lower() in ("true", "1", "yes"):
+        return True
+    if text.lower() in ("false", "0", "no"):
+        return False
+    raise argparse.ArgumentTypeError("not a boolean: %s" % text)
+
+# Parse a tone option: frequency, amplitude and phase
+def tone(text):
+    values = text.split(",")
+    return Stream.Tone(*[float(value) for value in values])
+
+# Parse a channel option: shape, frequency, magnitude and stream ID
+def channel(text):
+    values = text.split(",")
+    args = values[:1] + [float(value) for value in values[1:3]] + values[3:4]
+    return Stream.Channel(*args)
+
+# @param argv The arguments, without the program name
+# @return the parsed arguments, and the properties set by them
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Write the output of SigGen to files.")
+    parser.add_argument("output", help="File to write, - for stdout")
+    length = parser.add_mutually_exclusive_group(required=True)
+    length.add_argument("--samples", type=int, help="Number of elements of each channel")
+    length.add_argument("--seconds", type=float, help="Duration of each channel, in seconds")
+    parser.add_argument("--format", choices=("raw", "blue"), default="raw", help="File format (default: raw)")
+    parser.add_argument("--type", choices=sorted(TYPES), default="float", help="Type of the scalars (default: float)")
+    parser.add_argument("--quiet", action="store_true", help="Do not report the rate")
+    parser.add_argument("--start", type=float, help="Time of the first element, in seconds since the epoch (default: now)")
+    parser.add_argument("--tone", type=tone, action="append", dest="tones", metavar="FREQUENCY,AMPLITUDE,PHASE",
+                        help="Tone of the multitone shape, repeated for each tone")
+    parser.add_argument("--channel", type=channel, action="append", dest="channels",
+                        metavar="SHAPE,FREQUENCY,MAGNITUDE[,STREAM_ID]", help="Channel, repeated for each channel")
+    for name, value in sorted(Stream.Stream.DEFAULTS.items()):
+        if name in ("tones", "channels"):
+            continue
+        kind = boolean if isinstance(value, bool) else type(value)
+        parser.add_argument("--" + name, type=kind, default=value, help="(default: %s)" % value)
+    args = parser.parse_args(argv)
+    props = dict((name, getattr(args, name)) for name in Stream.Stream.DEFAULTS)
+    props["tones"] = args.tones or ()
+    props["channels"] = args.channels or ()
+    return args, props
+
+# Write the packets of a stream to files
+# @param stream The Stream
+# @param files  A file for each channel
+# @param count  Number of elements of each channel
+# @param fmt    File format, "raw" or "blue"
+# @param name   Type of the scalars, a key of TYPES
+def write(stream, files, count, fmt, name):
+    plan = stream.plan()
+    if fmt == "blue":
+        start = stream.next_time()
+        for channel, f in zip(plan.channels, files):
+            f.write(blue_header(channel.sri, start, count, name))
+    short = None
+    scratch = None
+    remaining = count
+    while remaining > 0:
+        data, stamp = stream.next_packet()
+        if name == "short":
+            if short is None:
+                short = np.empty(data.shape, dtype=np.int16)
+                scratch = np.empty(data.shape, dtype=np.float32)
+            data = Packet.to_short(data, short, scratch)
+        # The last packet is cut at count
+        n = min(remaining, plan.xfer_len)
+        for row, f in zip(data, files):
+            f.write(memoryview(row[:n*plan.spa]))
+        remaining -= n
+
+def main(argv=None):
+    args, props = parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        stream = Stream.Stream(args.start, **props)
+    except (EnvironmentError, ValueError), e:
+        sys.stderr.write("%s\n" % e)
+        return 2
+    try:
+        plan = stream.plan()
+        count = args.samples
+        if count is None:
+            count = int(round(args.seconds*plan.sample_rate))
+        
+        if args.output == "-":
+            if len(plan.channels) > 1:
+                sys.stderr.write("Several channels can not be written to stdout\n")
+                return 2
+            files = [io.open(sys.stdout.fileno(), "wb", BUFFER_SIZE, closefd=False)]
+        else:
+            root, ext = os.path.splitext(args.output)
+            paths = [args.output]
+            if len(plan.channels) > 1:
+                paths = ["%s_%d%s" % (root, i, ext) for i in range(len(plan.channels))]
+            try:
+                files = [io.open(path, "wb", BUFFER_SIZE) for path in paths]
+            except EnvironmentError, e:
+                sys.stderr.write("%s\n" % e)
+                return 2
+        
+        begin = time.time()
+        try:
+            write(stream, files, count, args.format, args.type)
+        finally:
+            for f in files:
+                f.close()
+        elapsed = time.time() - begin
+    finally:
+        stream.close()
+    
+    total = count*len(plan.channels)
+    if not args.quiet:
+        sys.stderr.write("%d samples in %.3f s: %.0f samples/s\n" % (total, elapsed, total/max(elapsed, 1e-9)))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Nco is a direct digital synthesizer for the periodic waveforms.
+
+The phase is an unsigned fixed-point accumulator of 32 or 64 bits that
+advances by a frequency word every element and wraps on overflow, so the
+phase is exact from packet to packet and does not drift however long it
+runs. Sine and cosine come from a lookup table indexed by the top bits of
+the phase, optionally with linear interpolation on the bits below them.
+'''
+import copy
+import math
+import numpy as np
+
+class Nco:
+    # Smallest and largest sine table, as a power of two
+    MIN_TABLE_BITS = 2
+    MAX_TABLE_BITS = 24
+
+    # @param table_size  Number of entries in one cycle of the sine table,
+    #                    rounded up to a power of two
+    # @param interpolate Interpolate linearly between table entries
+    # @param phase_bits  Width of the phase accumulator, 32 or 64
+    def __init__(self, table_size=4096, interpolate=True, phase_bits=32):
+        if phase_bits not in (32, 64):
+            raise ValueError("phase_bits must be 32 or 64, not %s" % phase_bits)
+        self.phase_bits = phase_bits
+        self.mask = np.uint64((1 << phase_bits) - 1)
+        # The phase as a float keeps its top 53 bits, which doubles represent
+        # exactly
+        self.float_shift = np.uint64(max(phase_bits - 53, 0))
+        self.float_scale = 2.0**-(phase_bits - int(self.float_shift))
+        self.accumulator = 0
+        # True when the first element of the next packet is past a wrap
+        self.wrap_pending = False
+        self.table_size = None
+        self.interpolate = None
+        self.configure(table_size, interpolate)
+
+    # Copies share the sine table, which is read-only
+    def __deepcopy__(self, memo):
+        return copy.copy(self)
+
+    # Rebuild the sine table if its size or interpolation changed
+    # @param table_size  Number of entries in one cycle of the sine table
+    # @param interpolate Interpolate linearly between table entries
+    def configure(self, table_size, interpolate):
+        interpolate = bool(interpolate)
+        if table_size == self.table_size and interpolate == self.interpolate:
+            return
+        bits = int(math.ceil(math.log(max(table_size, 1), 2)))
+        bits = min(max(bits, self.MIN_TABLE_BITS), self.MAX_TABLE_BITS)
+        self.table_size = table_size
+        self.interpolate = interpolate
+        self.table_bits = bits
+        # One extra entry so interpolation past the last entry needs no wrap
+        size = 1 << bits
+        self.table = np.sin(np.arange(size + 1, dtype=np.float64)*(2*math.pi/size))
+        self.table.flags.writeable = False
+        self.index_shift = np.uint64(self.phase_bits - bits)
+        self.fraction_mask = np.uint64((1 << (self.phase_bits - bits)) - 1)
+        self.fraction_scale = 2.0**-(self.phase_bits - bits)
+
+    # Get the phase, in cycles
+    def get_phase(self):
+        return float(self.accumulator >> int(self.float_shift))*self.float_scale
+
+    # Set the phase, in cycles
+    def set_phase(self, p):
+        self.accumulator = int(round((p % 1.0)*2.0**self.phase_bits)) & int(self.mask)
+        self.wrap_pending = False
+
+    # Convert a Delta Phase to a frequency word
+    # @param dp Delta Phase, in cycles per element
+    def frequency_word(self, dp):
+        return int(round(dp*2.0**self.phase_bits)) & int(self.mask)
+
+    # Create the phase accumulator of each element and advance the
+    # accumulator past them
+    # @param fw Frequency word
+    # @param n  Number of elements
+    # @return a uint64 array of accumulator values
+    def phases(self, fw, n):
+        phase = np.arange(n, dtype=np.uint64)
+        phase *= np.uint64(fw)
+        phase += np.uint64(self.accumulator)
+        phase &= self.mask
+        self.accumulator = (self.accumulator + fw*n) & int(self.mask)
+        return phase
+
+    # Advance the accumulator past elements without generating them, as
+    # phases and wrapped do
+    # @param fw Frequency word
+    # @param n  Number of elements
+    def advance(self, fw, n):
+        if n <= 0:
+            return
+        last = (self.accumulator + fw*(n - 1)) & int(self.mask)
+        self.accumulator = (last + fw) & int(self.mask)
+        self.wrap_pending = self.accumulator < last
+
+    # Find the elements where the accumulator wrapped, as the scalar
+    # accumulators of Waveform do; a wrap between packets marks the first
+    # element of the next packet
+    # @param phase The accumulator values of a packet
+    # @return a boolean array
+    def wrapped(self, phase):
+        n = len(phase)
+        wrapped = np.empty(n, dtype=bool)
+        if n == 0:
+            return wrapped
+        wrapped[0] = self.wrap_pending
+        np.less(phase[1:], phase[:-1], out=wrapped[1:])
+        self.wrap_pending = self.accumulator < int(phase[-1])
+        return wrapped
+
+    # Convert accumulator values to a float phase in [0, 1)
+    def to_float(self, phase):
+        fp = (phase >> self.float_shift).astype(np.float64)
+        fp *= self.float_scale
+        return fp
+
+    # Look up the sine of accumulator values
+    # @return a float64 array
+    def lookup(self, phase):
+        index = (phase >> self.index_shift).astype(np.intp)
+        value = self.table[index]
+        if self.interpolate:
+            fraction = (phase & self.fraction_mask).astype(np.float64)
+            fraction *= self.fraction_scale
+            fraction *= self.table[index + 1] - value
+            value += fraction
+        return value
+
+    # Copy one value per element into a float32 array, repeating it for
+    # both scalars of a complex element
+    def to_float32(self, value, spa, out=None):
+        if out is None:
+            out = np.empty(len(value)*spa, dtype=np.float32)
+        elif len(out) != len(value)*spa:
+            raise ValueError("output array has %d elements, expected %d" % (len(out), len(value)*spa))
+        for i in range(spa):
+            out[i::spa] = value
+        return out
+
+    # Create a SIN or COSINE array of given amplitude
+    # @param amp  Amplitude
+    # @param dp   Delta Phase
+    # @param n    Number of elements
+    # @param spa  Scalars per atom, 2 for Complex (cosine, sine)
+    # @param out  Optional float32 array to write the data to
+    # @return a contiguous float32 ndarray
+    def sincos(self, amp, dp, n, spa, out=None):
+        phase = self.phases(self.frequency_word(dp), n)
+        if abs(spa) != 2:
+            value = self.lookup(phase)
+            value *= amp
+            return self.to_float32(value, 1, out)
+        if out is None:
+            out = np.empty(n*2, dtype=np.float32)
+        elif len(out) != n*2:
+            raise ValueError("output array has %d elements, expected %d" % (len(out), n*2))
+        value = self.lookup(phase)
+        value *= amp
+        out[1::2] = value
+        # A quarter cycle ahead of the sine is the cosine
+        phase += np.uint64(1 << (self.phase_bits - 2))
+        phase &= self.mask
+        value = self.lookup(phase)
+        value *= amp
+        out[0::2] = value
+        return out
+
+    # Create a SQUARE array of given amplitude; the value is low on the
+    # element where the phase wraps
+    def square(self, amp, dp, n, spa, out=None):
+        phase = self.phases(self.frequency_word(dp), n)
+        wrapped = self.wrapped(phase)
+        famp = float(amp)
+        high = phase >= np.uint64(1 << (self.phase_bits - 1))
+        return self.to_float32(np.where(~wrapped & high, famp, -famp), spa, out)
+
+    # Create a TRIANGLE array of given amplitude
+    def triangle(self, amp, dp, n, spa, out=None):
+        fp = self.to_float(self.phases(self.frequency_word(dp), n))
+        fp -= 0.5
+        famp = float(amp)
+        return self.to_float32(famp - np.abs(fp)*(4*famp), spa, out)
+
+    # Create a SAWTOOTH array of given amplitude
+    def sawtooth(self, amp, dp, n, spa, out=None):
+        fp = self.to_float(self.phases(self.frequency_word(dp), n))
+        fp -= 0.5
+        fp *= 2*float(amp)
+        return self.to_float32(fp, spa, out)
+
+    # Create a PULSE array of given amplitude; the pulse is on the element
+    # where the phase wraps
+    def pulse(self, amp, dp, n, spa, out=None):
+        wrapped = self.wrapped(self.phases(self.frequency_word(dp), n))
+        return self.to_float32(np.where(wrapped, float(amp), 0.0), spa, out)
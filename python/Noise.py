@@ -0,0 +1,127 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Noise is a fast random noise engine for the gaussian, uniform and
+impulsive shapes.
+
+It draws from a NumPy Generator with a PCG64 or Philox bit generator, and
+writes float32 samples straight into the packet buffer. A seed and a
+stream number select the sequence: streams of one seed are independent,
+spawned from the same SeedSequence. Unlike Waveform.whitenoise, the
+sequence is not that of the C++ implementation.
+
+NumPy before 1.17 has no Generator; the engine then falls back to a
+RandomState seeded with the seed and stream, which gives a different
+sequence and draws in double precision.
+'''
+import numpy as np
+
+class Noise:
+    # Bit generators, by name
+    ENGINES = ("pcg64", "philox")
+
+    # Seeds and streams are taken modulo 2**64, so a negative value selects
+    # a sequence of its own
+    WORD_MASK = 0xffffffffffffffff
+
+    # @param seed   Seed of the sequence
+    # @param stream Number of the stream of the seed
+    # @param engine Bit generator, "pcg64" or "philox"
+    def __init__(self, seed=0, stream=0, engine="pcg64"):
+        if engine not in self.ENGINES:
+            raise ValueError("engine must be one of %s, not %s" % (", ".join(self.ENGINES), engine))
+        self.seed = seed
+        self.stream = stream
+        self.engine = engine
+        seed = int(seed) & self.WORD_MASK
+        stream = int(stream) & self.WORD_MASK
+        if hasattr(np.random, "Generator"):
+            sequence = np.random.SeedSequence(seed, spawn_key=(stream,))
+            if engine == "philox":
+                bits = np.random.Philox(sequence)
+            else:
+                bits = np.random.PCG64(sequence)
+            self._generator = np.random.Generator(bits)
+            self._legacy = None
+        else:
+            self._generator = None
+            # RandomState takes 32 bit words; the high words are only added
+            # when set, so the seeds and streams below 2**32 keep their
+            # sequence
+            words = [seed & 0xffffffff, stream & 0xffffffff]
+            if (seed | stream) >> 32:
+                words += [seed >> 32, stream >> 32]
+            self._legacy = np.random.RandomState(words)
+
+    # Get what selects the sequence, to tell if an engine can be reused
+    def key(self):
+        return (self.seed, self.stream, self.engine)
+
+    # Get the float32 array to write to
+    # @param out  Preallocated output array, or None to allocate a new one
+    # @param size Number of scalars
+    def output(self, out, size):
+        if out is None:
+            return np.empty(size, dtype=np.float32)
+        if len(out) != size:
+            raise ValueError("output array has %d elements, expected %d" % (len(out), size))
+        return out
+
+    # Fill an array with standard normal samples
+    def standard_normal(self, out):
+        if self._generator is not None:
+            self._generator.standard_normal(dtype=np.float32, out=out)
+        else:
+            out[:] = self._legacy.standard_normal(len(out))
+        return out
+
+    # Fill an array with uniform samples in [0, 1)
+    def random(self, out):
+        if self._generator is not None:
+            self._generator.random(dtype=np.float32, out=out)
+        else:
+            out[:] = self._legacy.random_sample(len(out))
+        return out
+
+    # Create a GAUSSIAN array. Each scalar, I and Q of a complex element
+    # alike, is an independent sample.
+    # @param sdev Standard deviation
+    # @param n    Number of elements
+    # @param spa  Scalars per atom, 2 for Complex
+    # @param out  Optional float32 array to write the data to
+    # @return a contiguous float32 ndarray
+    def gaussian(self, sdev, n, spa, out=None):
+        outbuff = self.standard_normal(self.output(out, n*spa))
+        outbuff *= sdev
+        return outbuff
+
+    # Create a UNIFORM array in [-amp, amp)
+    def uniform(self, amp, n, spa, out=None):
+        outbuff = self.random(self.output(out, n*spa))
+        outbuff *= 2*amp
+        outbuff -= amp
+        return outbuff
+
+    # Create an IMPULSIVE (Bernoulli-Gaussian) array: each scalar is a
+    # gaussian sample with the given probability, and 0 otherwise
+    # @param probability Probability of an impulse
+    def impulsive(self, sdev, probability, n, spa, out=None):
+        outbuff = self.gaussian(sdev, n, spa, out)
+        hits = self.random(np.empty(n*spa, dtype=np.float32))
+        outbuff[hits >= probability] = 0.0
+        return outbuff
@@ -0,0 +1,54 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Packet is one packet of output data of SigGen, ready to push.
+
+It carries the Plan it was generated with, so the SRI and time stamps
+follow the data even when packets are generated ahead of the push.
+'''
+import numpy as np
+
+# Saturate float data to the range of a short and truncate it toward zero,
+# in one pass over the whole buffer
+# @param data    The float32 data
+# @param out     Optional int16 array to write the result to
+# @param scratch Optional float32 array of the shape of the data, the data
+#                is saturated in
+# @return the int16 data
+def to_short(data, out=None, scratch=None):
+    shortMin = np.iinfo(np.int16).min
+    shortMax = np.iinfo(np.int16).max
+    if out is None:
+        out = np.empty(np.shape(data), dtype=np.int16)
+    if scratch is None:
+        scratch = np.empty(np.shape(data), dtype=np.float32)
+    
+    np.clip(data, shortMin, shortMax, out=scratch)
+    np.copyto(out, scratch, casting="unsafe")
+    return out
+
+class Packet:
+    # @param data float32 ndarray of the data, one row per channel, or None
+    #             once the lists are made and the buffer is reused
+    # @param plan The Plan the packet was generated with
+    def __init__(self, data, plan):
+        self.data = data
+        self.plan = plan
+        # Data as lists, one per channel, which is what omniORB marshals
+        self.float_list = None
+        self.short_list = None
@@ -0,0 +1,118 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+ParallelGenerator generates packets in a pool of worker processes.
+
+The channels of a packet are rows of a float32 buffer in shared memory,
+which the worker processes inherit when they are forked. Each row is split
+into ranges of elements when its shape is seekable: the generator is sent
+to every worker with its state at the start of the packet, and the worker
+advances it to the start of its range in closed form. Other rows, noise
+that can not be split, go to one worker each. The workers write straight
+into the buffer, so the packet is a view of it, with nothing copied back;
+the generators return with their state at the end of their range, which
+the last range of each row hands back to the component.
+'''
+import multiprocessing
+import numpy as np
+import Waveform
+import Wavetable
+
+# Engines and output buffer of a worker process
+_waveform = None
+_tables = None
+_shared = None
+
+def _initialize(shared):
+    global _waveform, _tables, _shared
+    _waveform = Waveform.Waveform()
+    _tables = Wavetable.WavetableCache(_waveform)
+    _shared = shared
+
+# View the shared buffer as rows of scalars
+def _rows(shared, rows, size):
+    return np.frombuffer(shared, dtype=np.float32, count=rows*size).reshape(rows, size)
+
+# Generate a range of elements of a row, in a worker process
+# @param task The Shape, its row, the number of rows and scalars per row of
+#             the buffer, and the first element and number of elements of
+#             the range
+# @return the Shape, with its state at the end of the range
+def _generate(task):
+    shape, row, rows, size, start, count = task
+    spa = shape.plan.spa
+    out = _rows(_shared, rows, size)[row, start*spa:(start + count)*spa]
+    shape.attach(_waveform, _tables)
+    if start:
+        shape.skip(start)
+    shape.fill(out, count)
+    shape.attach(None, None)
+    return shape
+
+class ParallelGenerator:
+    # Fewest elements in a range of a row
+    MIN_RANGE = 65536
+
+    # @param workers Number of worker processes
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = None
+        self._shared = None
+        self._capacity = 0
+
+    # Stop the worker processes
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    # Start the worker processes with a buffer of at least size scalars.
+    # The workers only see the buffer they were forked with, so a larger
+    # buffer takes new workers.
+    def reserve(self, size):
+        if self._pool is not None and size <= self._capacity:
+            return
+        self.close()
+        self._capacity = max(size, 1)
+        self._shared = multiprocessing.RawArray('f', self._capacity)
+        self._pool = multiprocessing.Pool(self.workers, _initialize, (self._shared,))
+
+    # Generate the next packet of every channel
+    # @param generators The Shape of each channel, taken over
+    # @param n          Number of elements of a channel
+    # @param size       Number of scalars of a channel
+    # @return a float32 array with a row for each channel, in the shared
+    #         buffer
+    def generate(self, generators, n, size):
+        rows = len(generators)
+        self.reserve(rows*size)
+        tasks = []
+        last = []
+        for row, generator in enumerate(generators):
+            parts = 1
+            if generator.closed_form():
+                parts = max(1, min(self.workers, n // self.MIN_RANGE))
+            bounds = [n*i//parts for i in range(parts + 1)]
+            for i in range(parts):
+                tasks.append((generator, row, rows, size, bounds[i], bounds[i + 1] - bounds[i]))
+            last.append(len(tasks) - 1)
+        results = self._pool.map(_generate, tasks)
+        for generator, i in zip(generators, last):
+            generator.adopt(results[i])
+        return _rows(self._shared, rows, size)
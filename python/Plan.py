@@ -0,0 +1,108 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Plan is the configuration SigGen generates and pushes packets with.
+
+It is compiled from the properties when they change, into the values the
+generators need (delta phase, buffer size, the generator of the shape) and
+the SRI. A Plan is never modified: a property change compiles a new one
+and replaces the old with a single assignment, so a packet is always made
+from one consistent configuration. version changes only when the waveform
+does, so packets generated ahead are kept across changes to the SRI alone.
+
+Each channel, one stream of output, has a Plan of its own. The Plan of the
+component is that of its first channel, with the Plans of all of them in
+channels.
+
+The properties are read from a configuration object with an attribute for
+each of them: the component, or a Stream generating without it. The SRI
+and the generator are added by the caller.
+'''
+import collections
+
+Plan = collections.namedtuple("Plan", [
+    "version",              # Version of the waveform
+    "shape",                # Name of the shape
+    "generator",            # Shapes generator of the shape, None if it is unknown
+    "magnitude",
+    "frequency",
+    "sample_rate",
+    "xdelta",               # Time between elements, in seconds
+    "delta_phase",          # Phase change per element, in cycles
+    "chirp",                # Sweep rate of the chirp shape, in Hz/s, 0 otherwise
+    "delta_phase_offset",   # Change of delta_phase per element
+    "xfer_len",             # Elements per packet
+    "spa",                  # Scalars per element, 2 for complex output
+    "size",                 # Scalars per packet
+    "repeats",              # Every packet is the same as the first
+    "phase_accumulator",
+    "nco_table_size",
+    "nco_interpolate",
+    "chirp_length",         # Elements in one sweep of the chirp shape
+    "chirp_pingpong",       # The chirp sweeps back down
+    "tones",                # Delta phase, amplitude and phase of each tone
+                            # of the multitone shape
+    "noise_engine",         # Bit generator of the Noise shapes
+    "noise_seed",
+    "noise_stream",         # Stream of noise_seed of the channel
+    "impulse_probability",
+    "snr",                  # SNR of the noise added to the shape, in dB, None
+                            # if no noise is added
+    "file_path",            # File played by the file shape
+    "file_type",            # Type of the scalars of a raw file
+    "file_scale",           # Factor the samples of the file are scaled by
+    "sri",                  # SRI of the stream
+    "channels",             # Plans of the channels, each with no channels
+])
+
+# Get the channels of a configuration
+# @param config The object holding the properties
+# @return the shape, frequency, magnitude and stream ID of each channel
+def channel_specs(config):
+    if config.channels:
+        return [(c.shape, c.frequency, c.magnitude, c.stream_id or "%s_%d" % (config.stream_id, i))
+                for i, c in enumerate(config.channels)]
+    return [(config.shape, config.frequency, config.magnitude, config.stream_id)]
+
+# Compile the plan of one channel, without its generator and SRI
+# @param config  The object holding the properties
+# @param version Version of the waveform
+# @param index   Index of the channel
+# @param spec    Shape, frequency, magnitude and stream ID of the channel
+def compile_channel(config, version, index, spec):
+    shape, frequency, magnitude, stream_id = spec
+    spa = 2 if config.complex_output else 1
+    xdelta = 1.0/config.sample_rate
+    delta_phase = frequency * xdelta
+    chirp = config.chirp_rate if shape == "chirp" else 0
+    delta_phase_offset = chirp * xdelta * xdelta
+    if ((delta_phase < 0) and (shape not in ("sine", "chirp"))):
+        delta_phase = -delta_phase
+    chirp_length = None
+    if chirp != 0 and config.chirp_bandwidth > 0:
+        chirp_length = config.chirp_bandwidth / abs(chirp) * config.sample_rate
+    tones = tuple((t.frequency * xdelta, t.amplitude, t.phase) for t in config.tones)
+    snr = config.snr if config.add_noise else None
+    file_scale = magnitude if config.file_scaled else 1.0
+    
+    return Plan(version, shape, None, magnitude, frequency, config.sample_rate,
+                xdelta, delta_phase, chirp, delta_phase_offset, config.xfer_len, spa,
+                config.xfer_len*spa, False, config.phase_accumulator, config.nco_table_size,
+                config.nco_interpolate, chirp_length, config.chirp_mode == "pingpong", tones, config.noise_engine,
+                config.noise_seed, config.noise_stream + index, config.impulse_probability, snr,
+                config.file_path, config.file_type, file_scale, None, ())
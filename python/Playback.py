@@ -0,0 +1,104 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Playback plays the scalars of a file in a loop, from a memory mapping.
+
+The file is never read as a whole: the pages of a packet are read by the
+operating system as it is copied or pushed, and the scalars are used where
+they are in the mapping, so a packet that does not wrap and is not scaled
+is a view of the file. The file is a NumPy .npy file (complex arrays are
+interleaved I and Q), a BLUE file, or raw scalars of a given type.
+'''
+import numpy as np
+
+class Playback:
+    # Types of the scalars of raw files, by name
+    TYPES = {"float": np.float32,
+             "short": np.int16}
+
+    # Types of the scalars of BLUE files, by format code, and the size of
+    # their header
+    BLUE_TYPES = {"F": np.float32,
+                  "D": np.float64,
+                  "I": np.int16,
+                  "L": np.int32,
+                  "B": np.int8}
+    BLUE_HEADER_SIZE = 512
+
+    # @param path Path of the file
+    # @param kind Type of the scalars of a raw file, a key of TYPES
+    def __init__(self, path, kind="float"):
+        self.path = path
+        self.kind = kind
+        self.scalars = self.map(path, kind)
+
+    # Map a file
+    # @return a read-only one dimensional array of the scalars in the
+    #         file, in the order they are stored
+    def map(self, path, kind):
+        if path.endswith(".npy"):
+            data = np.load(path, mmap_mode="r")
+        else:
+            with open(path, "rb") as f:
+                header = f.read(self.BLUE_HEADER_SIZE)
+            if header[:4] == "BLUE":
+                data = self.map_blue(path, header)
+            elif kind in self.TYPES:
+                data = np.memmap(path, dtype=self.TYPES[kind], mode="r")
+            else:
+                raise ValueError("unknown file type %s" % kind)
+        data = np.asarray(data).ravel(order="K")
+        if np.iscomplexobj(data):
+            data = data.view(data.real.dtype)
+        return data
+
+    # Map the data of a BLUE file
+    def map_blue(self, path, header):
+        endian = "<" if header[8:12] == "EEEI" else ">"
+        start, size = np.frombuffer(header[32:48], dtype=endian + "f8")
+        code = header[53:54]
+        if code not in self.BLUE_TYPES:
+            raise ValueError("%s: unsupported BLUE format %s" % (path, header[52:54]))
+        dtype = np.dtype(self.BLUE_TYPES[code]).newbyteorder(endian)
+        return np.memmap(path, dtype=dtype, mode="r", offset=int(start), shape=(int(size)//dtype.itemsize,))
+
+    # Get the number of elements in the file
+    # @param spa Scalars per atom, 2 for Complex
+    def elements(self, spa):
+        return len(self.scalars)//spa
+
+    # Read a packet, wrapping at the end of the file
+    # @param position Element to start from
+    # @param n        Number of elements
+    # @param spa      Scalars per atom, 2 for Complex
+    # @param scale    Factor the scalars are multiplied by
+    # @param out      float32 array of n*spa elements
+    # @return the data: a read-only view of the file, or out, and the
+    #         element after it
+    def read(self, position, n, spa, scale, out):
+        length = self.elements(spa)
+        if position + n <= length and scale == 1.0 and self.scalars.dtype == np.float32:
+            return self.scalars[position*spa:(position + n)*spa], (position + n) % length
+        i = 0
+        while i < n:
+            m = min(n - i, length - position)
+            np.multiply(self.scalars[position*spa:(position + m)*spa], scale,
+                        out=out[i*spa:(i + m)*spa], casting="unsafe")
+            i += m
+            position = (position + m) % length
+        return out, position
@@ -0,0 +1,84 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Properties holds the default values of the properties of SigGen, for the
+component and for Stream, which generates its packets without CORBA.
+
+The properties of SigGen.prf.xml, which SigGen_base.py is generated from,
+are read from it. The properties of the python implementation only are
+defined here, and SigGen.py declares them with these defaults.
+'''
+import os
+import xml.etree.ElementTree as ElementTree
+
+# The property file of the component, next to the python directory
+PRF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "SigGen.prf.xml")
+
+# Conversion of the value of a simple property, by type
+TYPES = {"double": float,
+         "float": float,
+         "long": int,
+         "short": int,
+         "ulong": int,
+         "boolean": lambda text: text.strip().lower() == "true",
+         "string": str}
+
+# Default values of the properties of the python implementation only
+PYTHON_DEFAULTS = {"phase_accumulator": "float",
+                   "nco_table_size": 4096,
+                   "nco_interpolate": True,
+                   "complex_output": False,
+                   "chirp_rate": 1000.0,
+                   "chirp_bandwidth": 1000.0,
+                   "chirp_mode": "repeat",
+                   "prefetch_depth": 0,
+                   "workers": 0,
+                   "noise_engine": "pcg64",
+                   "noise_seed": 0,
+                   "noise_stream": 0,
+                   "impulse_probability": 0.01,
+                   "add_noise": False,
+                   "snr": 20.0,
+                   "file_path": "",
+                   "file_type": "float",
+                   "file_scaled": False,
+                   "tones": (),
+                   "channels": ()}
+
+# Default values of the members of an element of the tones and channels
+# properties
+TONE_DEFAULTS = {"frequency": 1000.0, "amplitude": 1.0, "phase": 0.0}
+CHANNEL_DEFAULTS = {"shape": "sine", "frequency": 1000.0, "magnitude": 100.0, "stream_id": ""}
+
+# Read the default values of the simple properties of a property file
+# @param path Path of the file
+# @return the values, by id
+def read_prf(path=PRF_PATH):
+    values = {}
+    for simple in ElementTree.parse(path).getroot().findall("simple"):
+        value = simple.find("value")
+        if value is not None:
+            values[simple.get("id")] = TYPES[simple.get("type")](value.text or "")
+    return values
+
+# Get the default values of all properties
+# @return the values, by id
+def defaults():
+    values = read_prf()
+    values.update(PYTHON_DEFAULTS)
+    return values
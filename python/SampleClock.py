@@ -0,0 +1,85 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+SampleClock time stamps packets from the number of elements output.
+
+The time of element count is the start time plus count/sample_rate. The
+sample rate, a double, is exactly a fraction num/den, so the whole and
+fractional seconds are an integer divmod of count*den by num: the time
+stamps do not accumulate rounding error however long the stream runs, and
+are exact multiples of the sample period when the sample rate is integral.
+'''
+import copy
+import fractions
+
+class SampleClock:
+    # @param start       Time of the first element, a BULKIO.PrecisionUTCTime
+    # @param sample_rate Elements per second
+    def __init__(self, start=None, sample_rate=1.0):
+        self.reset(start, sample_rate)
+
+    # Start counting over
+    # @param start       Time of the next element
+    # @param sample_rate Elements per second
+    def reset(self, start, sample_rate):
+        self.start = start
+        self.count = 0
+        self.sample_rate = None
+        self.set_rate(sample_rate)
+
+    # Change the sample rate from the next element on
+    def set_rate(self, sample_rate):
+        if sample_rate == self.sample_rate:
+            return
+        if self.count and self.start is not None:
+            self.start = self.time()
+            self.count = 0
+        self.sample_rate = sample_rate
+        rate = fractions.Fraction(sample_rate)
+        self.num = rate.numerator
+        self.den = rate.denominator
+
+    # Get the time of an element
+    # @param count Elements after the start, the next element if None
+    # @return a copy of the start time, advanced to the element
+    def time(self, count=None):
+        if count is None:
+            count = self.count
+        whole, rem = divmod(count*self.den, self.num)
+        t = copy.copy(self.start)
+        t.tfsec = self.start.tfsec + float(rem)/self.num
+        t.twsec = self.start.twsec + whole
+        if t.tfsec >= 1.0:
+            t.tfsec -= 1.0
+            t.twsec += 1.0
+        return t
+
+    # Move past elements that were output
+    # @param n Number of elements
+    def advance(self, n):
+        self.count += n
+
+    # Time stamp a batch of packets and move past them
+    # @param sizes Number of elements in each packet
+    # @return the time of the first element of each packet
+    def times(self, sizes):
+        stamps = []
+        for n in sizes:
+            stamps.append(self.time())
+            self.count += n
+        return stamps
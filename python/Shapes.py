@@ -0,0 +1,794 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Shapes is the registry of the waveform shapes SigGen generates.
+
+Each shape is a class registered under the name the shape property selects
+it by. A generator is created for every plan, and generates each packet
+into a buffer with generate_into. The running state of a shape (the phase,
+the noise seed, the ramp value) lives in the slots of its generator. When a
+generator takes over from the last one, it picks up that state once: all of
+it from a generator of its own kind, and the state it shares with the
+others (the phase of the periodic shapes, the seed of a noise shape that
+ran earlier) from what they left. Switching shapes is continuous and
+nothing is handed over per packet.
+
+Every generator counts the elements of its channel, and keeps a copy of
+itself as it took over (its origin), so any element since then can be
+generated again with generate, without touching the running state, or the
+running state moved to it with seek. A shape moves its state ahead with
+advance: in closed form when it is seekable (the phase, the LRS register,
+the ramp value), otherwise by drawing and dropping the elements in
+between a packet at a time, since where the packets end changes the
+sequence of the noise. A seekable packet can be generated in ranges, in parallel. A
+generator pickles without its engines, its origin and the SRI; the process
+it is sent to attaches its own.
+
+A shape whose power is known can have gaussian noise added to it at the
+SNR of the plan. The noise comes from the whitenoise generator of
+Waveform, and carries on the sequence of the whitenoise shape.
+
+A new shape is added by registering a subclass of Shape:
+
+    @Shapes.register("name")
+    class NameShape(Shapes.Shape):
+        __slots__ = ("value",)
+        ...
+'''
+import copy
+import math
+import numpy as np
+import Chirp
+import Nco
+import Noise
+import Playback
+
+# Shape classes by name
+SHAPES = {}
+
+# Waveform.whitenoise takes a base 10 logarithm where the polar method takes
+# a natural one, so the variance of its output is sdev**2/ln(10). Its sdev
+# is scaled by this to get noise of a given deviation.
+NOISE_SCALE = math.sqrt(math.log(10.0))
+
+# Class decorator registering a Shape class
+# @param name Name of the shape, as set in the shape property
+def register(name):
+    def add(cls):
+        SHAPES[name] = cls
+        return cls
+    return add
+
+# Create the generator of a plan
+# @param plan     The Plan to generate with
+# @param waveform The Waveform engine
+# @param tables   The WavetableCache of the periodic shapes
+# @return the Shape, or None if the shape is unknown
+def create(plan, waveform, tables):
+    cls = SHAPES.get(plan.shape)
+    if cls is None:
+        return None
+    return cls(plan, waveform, tables)
+
+# Have new generators take over the running state of the last generator
+# of their channel
+# @param previous   The generator of each channel of the last packet
+# @param generators The generator of each channel of the next packet
+# @return generators
+def take_over(previous, generators):
+    for i, generator in enumerate(generators):
+        if i >= len(previous) or generator is not previous[i]:
+            generator.take_over(previous[i] if i < len(previous) else None)
+    return generators
+
+# Get a buffer with a row for each channel
+# @param buffer The buffer of the last packet, reused if it has the shape
+# @param rows   Number of channels
+# @param size   Number of scalars of a channel
+# @return a float32 array of rows x size
+def packet_buffer(buffer, rows, size):
+    if buffer is not None and buffer.shape == (rows, size):
+        return buffer
+    return np.empty((rows, size), dtype=np.float32)
+
+# Generate the next packet of every channel
+# @param generators The Shape of each channel, taken over
+# @param buffer     float32 array with a row for each channel
+# @param n          Number of elements of a channel
+# @param parallel   ParallelGenerator to generate with, or None to
+#                   generate here
+# @return a float32 array with a row for each channel: the buffer, the
+#         shared buffer of parallel, or a view of the data of the shape of
+#         a single channel
+def generate_packet(generators, buffer, n, parallel=None):
+    if parallel is not None:
+        return parallel.generate(generators, n, buffer.shape[1])
+    if len(generators) == 1:
+        return generators[0].render(buffer[0], n).reshape(1, -1)
+    for i, generator in enumerate(generators):
+        generator.fill(buffer[i], n)
+    return buffer
+
+# Check if a tone has a whole number of cycles per packet, so each packet
+# starts at the same phase
+# @param tables   The WavetableCache, which finds the period of the tone
+# @param dp       Delta Phase
+# @param xfer_len Elements per packet
+def whole_cycles(tables, dp, xfer_len):
+    period = tables.period(dp)
+    if period is None:
+        return False
+    cycles, q = period
+    return (cycles*xfer_len) % q == 0
+
+class Shape(object):
+    __slots__ = ("plan", "waveform", "tables", "carry", "origin", "seed", "noise", "index")
+
+    # Slots that are not state of the shape
+    ENGINE_SLOTS = ("plan", "waveform", "tables", "carry", "origin")
+
+    def __init__(self, plan, waveform, tables):
+        self.plan = plan
+        self.waveform = waveform
+        self.tables = tables
+        # State left by the generators before this one, by name
+        self.carry = {}
+        # Seed of the whitenoise generator, and the deviation it adds noise
+        # with. Each channel starts a stream of its own.
+        self.seed = waveform.stream_seed(plan.noise_stream)
+        self.noise = 0.0
+        # Index of the next element of the channel, and a copy of the
+        # generator at the element it took over at
+        self.index = 0
+        self.origin = None
+
+    # Names of all slots of the class and its bases
+    def slots(self):
+        names = []
+        for cls in type(self).__mro__:
+            names.extend(cls.__dict__.get("__slots__", ()))
+        return names
+
+    def __getstate__(self):
+        state = dict((name, getattr(self, name)) for name in self.slots() if name not in self.ENGINE_SLOTS)
+        state["plan"] = self.plan._replace(generator=None, sri=None, channels=())
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.carry = {}
+        self.origin = None
+        self.attach(None, None)
+
+    # Set the engines the shape is generated with
+    def attach(self, waveform, tables):
+        self.waveform = waveform
+        self.tables = tables
+
+    # Take the state of a copy of this generator, which generated the
+    # elements since
+    def adopt(self, other):
+        for name in self.slots():
+            if name not in self.ENGINE_SLOTS:
+                setattr(self, name, getattr(other, name))
+
+    # Take over from the generator of the previous packet. Called once,
+    # in the thread generating the packets, before the first packet.
+    # @param previous The previous Shape, or None
+    def take_over(self, previous):
+        carry = {}
+        if previous is not None:
+            carry.update(previous.carry)
+            carry.update(previous.save())
+            carry["seed"] = previous.seed
+        self.carry = carry
+        self.seed = carry.get("seed", self.seed)
+        self.noise = self.noise_deviation()
+        self.restore(carry, previous)
+        if previous is not None:
+            self.index = previous.index
+        self.origin = copy.deepcopy(self)
+
+    # Get the state shared with the other shapes, by name
+    def save(self):
+        return {}
+
+    # Set the state when taking over
+    # @param carry    State left by the generators before this one
+    # @param previous The previous Shape, or None
+    def restore(self, carry, previous):
+        pass
+
+    # Check if every packet is the same as the first
+    def repeats(self):
+        return False
+
+    # Check if the state of the shape a number of elements ahead has a
+    # closed form
+    def seekable(self):
+        return False
+
+    # Move the state of the shape past elements without generating them.
+    # Seekable shapes do it in closed form; the others generate the
+    # elements and drop them, a packet of plan.xfer_len at a time, since
+    # their state depends on where the packets end.
+    # @param n Number of elements
+    def advance(self, n):
+        spa = self.plan.spa
+        xfer_len = self.plan.xfer_len
+        buffer = np.empty(min(n, xfer_len)*spa, dtype=np.float32)
+        while n > 0:
+            m = min(n, xfer_len)
+            self.generate_into(buffer[:m*spa], m)
+            n -= m
+
+    # Check if elements can be skipped to any element, not only to the
+    # start of a packet: the shape is seekable and no noise is added to it
+    def closed_form(self):
+        return self.seekable() and not self.noise
+
+    # Move the generator past elements without generating them, with the
+    # noise added to them
+    # @param n Number of elements, a whole number of packets unless
+    #          closed_form
+    def skip(self, n):
+        self.advance(n)
+        if self.noise:
+            # Each packet drops the second value of an odd last pair
+            xfer_len = self.plan.xfer_len
+            self.waveform.seed = self.seed
+            for start in range(0, n, xfer_len):
+                self.waveform.whitenoise_advance(min(xfer_len, n - start), self.plan.spa)
+            self.seed = self.waveform.seed
+        self.index += n
+
+    # Get a copy of the generator at the start of the packet holding an
+    # element, from its origin. The packets start at the origin, every
+    # plan.xfer_len elements.
+    # @param index Index of the element in the channel
+    # @return the Shape, attached to the engines of this one, and the
+    #         index of the element in its packet
+    def at(self, index):
+        if self.origin is None:
+            raise ValueError("the generator has not taken over yet")
+        if index < self.origin.index:
+            raise ValueError("element %d is before element %d, where the generator took over" % (index, self.origin.index))
+        offset = index - self.origin.index
+        lead = offset % self.plan.xfer_len
+        shape = copy.deepcopy(self.origin)
+        shape.plan = self.plan
+        shape.attach(self.waveform, self.tables)
+        shape.skip(offset - lead)
+        return shape, lead
+
+    # Generate elements from any element on, leaving the running state as
+    # it is. The packets holding them are generated whole, as the stream
+    # generated them.
+    # @param start_index Index of the first element in the channel
+    # @param n           Number of elements
+    # @param out         Optional float32 array of n*plan.spa elements
+    # @return a float32 array holding the elements, with the noise added
+    def generate(self, start_index, n, out=None):
+        spa = self.plan.spa
+        xfer_len = self.plan.xfer_len
+        shape, lead = self.at(start_index)
+        packets = (lead + n + xfer_len - 1)//xfer_len
+        data = np.empty(packets*xfer_len*spa, dtype=np.float32)
+        for i in range(packets):
+            shape.fill(data[i*xfer_len*spa:(i + 1)*xfer_len*spa], xfer_len)
+        data = data[lead*spa:(lead + n)*spa]
+        if out is None:
+            return data
+        out[:] = data
+        return out
+
+    # Move the running state to an element, as if the elements up to it
+    # had been generated. Unless closed_form, the element starts a packet.
+    # @param index Index of the element in the channel
+    def seek(self, index):
+        shape, lead = self.at(index)
+        if lead:
+            if not shape.closed_form():
+                raise ValueError("element %d does not start a packet of the %s shape" % (index, self.plan.shape))
+            shape.skip(lead)
+        self.adopt(shape)
+
+    # Get the mean square of the scalars of the shape, or None if it is not
+    # known
+    def power(self):
+        return None
+
+    # Get the deviation of the noise added to the shape, 0.0 if none is
+    # added: the power of the shape over the SNR of the plan
+    def noise_deviation(self):
+        power = self.power()
+        if self.plan.snr is None or power is None:
+            return 0.0
+        return math.sqrt(power / 10.0**(self.plan.snr/10.0))
+
+    # Generate the next packet into a buffer, with the noise added
+    # @param out float32 array of n*plan.spa elements
+    # @param n   Number of elements
+    def fill(self, out, n):
+        data = self.generate_into(out, n)
+        if data is not out:
+            out[:] = data
+        if self.noise:
+            self.add_noise(out, n)
+        self.index += n
+
+    # Generate the next packet, with the noise added, leaving it where the
+    # shape has it when it can
+    # @param out float32 array of n*plan.spa elements
+    # @param n   Number of elements
+    # @return the float32 data: out, or a read-only array holding the
+    #         same packet
+    def render(self, out, n):
+        if self.noise:
+            self.fill(out, n)
+            return out
+        data = self.generate_into(out, n)
+        self.index += n
+        return data
+
+    # Add the noise to a packet, in place
+    # @param buffer float32 array of n*plan.spa elements holding the packet
+    # @param n      Number of elements
+    def add_noise(self, buffer, n):
+        self.waveform.seed = self.seed
+        self.waveform.whitenoise(self.noise*NOISE_SCALE, n, self.plan.spa, buffer, True)
+        self.seed = self.waveform.seed
+
+    # Generate the next packet
+    # @param buffer float32 array of n*plan.spa elements
+    # @param n      Number of elements
+    # @return the float32 data: buffer, or a read-only array holding the
+    #         same packet
+    def generate_into(self, buffer, n):
+        raise NotImplementedError
+
+# Shapes generated from a running phase, with the float accumulator of
+# Waveform or the fixed-point accumulator of Nco
+class PeriodicShape(Shape):
+    __slots__ = ("phase", "nco")
+
+    # Name of the Waveform and Nco method generating the shape, and the
+    # mean square of the shape relative to the square of the amplitude
+    METHOD = None
+    POWER = 1.0
+    # The shape jumps where the phase crosses a boundary. With the float
+    # accumulator, the rounding of the accumulator since the start of the
+    # packet decides where, so the elements of a packet can not be
+    # generated from the middle of it.
+    JUMPS = False
+
+    def __init__(self, plan, waveform, tables):
+        Shape.__init__(self, plan, waveform, tables)
+        self.phase = 0.0
+        # Fixed-point accumulator, while phase_accumulator is "nco"
+        self.nco = None
+
+    def save(self):
+        if self.nco is not None:
+            self.phase = self.nco.get_phase()
+        return {"phase": self.phase}
+
+    # The fixed-point accumulator carries over exactly between periodic
+    # shapes; otherwise it starts from the running phase
+    def restore(self, carry, previous):
+        self.phase = carry.get("phase", 0.0)
+        if self.plan.phase_accumulator != "nco":
+            return
+        if isinstance(previous, PeriodicShape) and previous.nco is not None:
+            self.nco = previous.nco
+        else:
+            self.nco = Nco.Nco()
+            self.nco.set_phase(self.phase)
+        self.nco.configure(self.plan.nco_table_size, self.plan.nco_interpolate)
+
+    def repeats(self):
+        return whole_cycles(self.tables, self.plan.delta_phase, self.plan.xfer_len)
+
+    def seekable(self):
+        return True
+
+    def closed_form(self):
+        if self.JUMPS and self.nco is None:
+            return False
+        return Shape.closed_form(self)
+
+    # The float phase moves on a packet at a time, rounding as the packets
+    # generated by the stream do
+    def advance(self, n):
+        if self.nco is not None:
+            self.nco.advance(self.nco.frequency_word(self.plan.delta_phase), n)
+            return
+        xfer_len = self.plan.xfer_len
+        while n > 0:
+            m = min(n, xfer_len)
+            self.phase += self.plan.delta_phase*m
+            self.phase -= math.floor(self.phase)
+            n -= m
+
+    def power(self):
+        return self.POWER * self.plan.magnitude**2
+
+    # Waveforms that repeat every few samples are served from a table
+    def generate_into(self, buffer, n):
+        plan = self.plan
+        if self.nco is not None:
+            generator = getattr(self.nco, self.METHOD)
+            return generator(plan.magnitude, plan.delta_phase, n, plan.spa, buffer)
+        data, phase = self.tables.lookup(plan.shape, plan.magnitude, plan.frequency, plan.sample_rate,
+                                         self.phase, plan.delta_phase, n, plan.spa)
+        if data is not None:
+            self.phase = phase
+            return data
+        generator = getattr(self.waveform, self.METHOD)
+        data = generator(plan.magnitude, self.phase, plan.delta_phase, n, plan.spa, buffer)
+        self.phase += plan.delta_phase*n # increment phase
+        self.phase -= math.floor(self.phase) # module 1.0
+        return data
+
+@register("sine")
+class SineShape(PeriodicShape):
+    __slots__ = ()
+    METHOD = "sincos"
+    POWER = 0.5
+
+@register("square")
+class SquareShape(PeriodicShape):
+    __slots__ = ()
+    METHOD = "square"
+    JUMPS = True
+
+@register("triangle")
+class TriangleShape(PeriodicShape):
+    __slots__ = ()
+    METHOD = "triangle"
+    POWER = 1.0/3.0
+
+@register("sawtooth")
+class SawtoothShape(PeriodicShape):
+    __slots__ = ()
+    METHOD = "sawtooth"
+    POWER = 1.0/3.0
+    JUMPS = True
+
+@register("pulse")
+class PulseShape(PeriodicShape):
+    __slots__ = ()
+    METHOD = "pulse"
+    JUMPS = True
+
+    # One pulse per cycle
+    def power(self):
+        return min(abs(self.plan.delta_phase), 1.0) * self.plan.magnitude**2
+
+# Linear FM sweep. A sweep with no rate or no bandwidth is a tone at
+# frequency.
+@register("chirp")
+class ChirpShape(Shape):
+    __slots__ = ("phase", "sweep", "engine")
+
+    def __init__(self, plan, waveform, tables):
+        Shape.__init__(self, plan, waveform, tables)
+        self.phase = 0.0
+        # Parameters of the running sweep, None until it starts
+        self.sweep = None
+        self.engine = Chirp.Chirp()
+
+    def save(self):
+        return {"phase": self.phase}
+
+    def power(self):
+        return 0.5 * self.plan.magnitude**2
+
+    def seekable(self):
+        return True
+
+    def advance(self, n):
+        plan = self.plan
+        if plan.chirp_length is None:
+            self.sweep = None
+            self.phase += plan.delta_phase*n
+            self.phase -= math.floor(self.phase)
+            return
+        sweep = self.start_sweep()
+        self.engine.advance(sweep[0], sweep[1], sweep[2], sweep[3], n)
+        self.phase = self.engine.get_phase(*sweep)
+
+    # Start a new sweep from the running phase if its parameters changed
+    # @return the parameters of the sweep
+    def start_sweep(self):
+        plan = self.plan
+        sweep = (plan.delta_phase, plan.delta_phase_offset, plan.chirp_length, plan.chirp_pingpong)
+        if sweep != self.sweep:
+            self.engine.start(self.phase)
+            self.sweep = sweep
+        return sweep
+
+    # A sweep with the same parameters carries on where it was
+    def restore(self, carry, previous):
+        self.phase = carry.get("phase", 0.0)
+        if isinstance(previous, ChirpShape) and previous.sweep is not None:
+            self.sweep = previous.sweep
+            self.engine = previous.engine
+
+    def generate_into(self, buffer, n):
+        plan = self.plan
+        if plan.chirp_length is None:
+            self.sweep = None
+            data = self.waveform.sincos(plan.magnitude, self.phase, plan.delta_phase, n, plan.spa, buffer)
+            self.phase += plan.delta_phase*n
+            self.phase -= math.floor(self.phase)
+            return data
+
+        sweep = self.start_sweep()
+        data = self.engine.chirp(plan.magnitude, sweep[0], sweep[1], sweep[2], sweep[3], n, plan.spa, buffer)
+        self.phase = self.engine.get_phase(*sweep)
+        return data
+
+# Sum of the sines of plan.tones, each scaled by its amplitude and the
+# magnitude. The phases of all tones over a block of elements are one
+# broadcast matrix, summed by a product with the amplitudes.
+@register("multitone")
+class MultitoneShape(Shape):
+    __slots__ = ("delta_phases", "amplitudes", "phases")
+
+    # Largest number of phases, tones times elements, evaluated at once
+    BLOCK = 1 << 18
+
+    def __init__(self, plan, waveform, tables):
+        Shape.__init__(self, plan, waveform, tables)
+        tones = np.array(plan.tones, dtype=np.float64).reshape(-1, 3)
+        self.delta_phases = tones[:, 0]
+        self.amplitudes = tones[:, 1]*plan.magnitude
+        # Running phase of each tone
+        self.phases = tones[:, 2] % 1.0
+
+    # The tones carry on where they were; a tone that was not there
+    # before starts at its phase
+    def restore(self, carry, previous):
+        if isinstance(previous, MultitoneShape):
+            k = min(len(self.phases), len(previous.phases))
+            self.phases[:k] = previous.phases[:k]
+
+    def repeats(self):
+        return all(whole_cycles(self.tables, dp, self.plan.xfer_len) for dp in self.delta_phases)
+
+    def seekable(self):
+        return True
+
+    def advance(self, n):
+        self.phases += self.delta_phases*n
+        self.phases -= np.floor(self.phases)
+
+    # The power of tones of different frequencies adds up
+    def power(self):
+        return 0.5 * float(np.sum(self.amplitudes**2))
+
+    def generate_into(self, buffer, n):
+        spa = self.plan.spa
+        dp = self.delta_phases
+        step = max(1, min(n, self.BLOCK // max(len(dp), 1)))
+        t = np.arange(step, dtype=np.float64)
+        for start in range(0, n, step):
+            m = min(step, n - start)
+            phase = np.multiply.outer(dp, t[:m])
+            phase += (self.phases + dp*start)[:, np.newaxis]
+            phase -= np.floor(phase)
+            phase *= 2*math.pi
+            if spa == 2:
+                buffer[2*start:2*(start + m):2] = self.amplitudes.dot(np.cos(phase))
+                buffer[2*start + 1:2*(start + m):2] = self.amplitudes.dot(np.sin(phase, out=phase))
+            else:
+                buffer[start:start + m] = self.amplitudes.dot(np.sin(phase, out=phase))
+        self.phases += dp*n
+        self.phases -= np.floor(self.phases)
+        return buffer
+
+@register("constant")
+class ConstantShape(Shape):
+    __slots__ = ()
+
+    def repeats(self):
+        return True
+
+    def power(self):
+        return self.plan.magnitude**2
+
+    def seekable(self):
+        return True
+
+    def advance(self, n):
+        pass
+
+    def generate_into(self, buffer, n):
+        return self.waveform.constant(self.plan.magnitude, n, self.plan.spa, buffer)
+
+# The seed of the Waveform engine is set from the slot for each packet, so
+# the sequence carries on across the shapes in between
+@register("whitenoise")
+class WhitenoiseShape(Shape):
+    __slots__ = ()
+
+    def advance(self, n):
+        xfer_len = self.plan.xfer_len
+        self.waveform.seed = self.seed
+        for start in range(0, n, xfer_len):
+            self.waveform.whitenoise_advance(min(xfer_len, n - start), self.plan.spa)
+        self.seed = self.waveform.seed
+
+    def generate_into(self, buffer, n):
+        self.waveform.seed = self.seed
+        data = self.waveform.whitenoise(self.plan.magnitude, n, self.plan.spa, buffer)
+        self.seed = self.waveform.seed
+        return data
+
+# Noise from the Noise engine. The engine of the seed, stream and bit
+# generator of the plan carries on across the shapes in between; another
+# seed, stream or bit generator starts its sequence over.
+class RandomShape(Shape):
+    __slots__ = ("engine",)
+
+    # Name of the Noise method generating the shape
+    METHOD = None
+
+    def __init__(self, plan, waveform, tables):
+        Shape.__init__(self, plan, waveform, tables)
+        self.engine = None
+
+    def save(self):
+        return {"random": self.engine}
+
+    # An unknown bit generator is the first one, as an unknown
+    # phase_accumulator is the float one
+    def restore(self, carry, previous):
+        plan = self.plan
+        name = plan.noise_engine if plan.noise_engine in Noise.Noise.ENGINES else Noise.Noise.ENGINES[0]
+        key = (plan.noise_seed, plan.noise_stream, name)
+        engine = carry.get("random")
+        if engine is None or engine.key() != key:
+            engine = Noise.Noise(*key)
+        self.engine = engine
+
+    def generate_into(self, buffer, n):
+        generator = getattr(self.engine, self.METHOD)
+        return generator(self.plan.magnitude, n, self.plan.spa, buffer)
+
+@register("gaussian")
+class GaussianShape(RandomShape):
+    __slots__ = ()
+    METHOD = "gaussian"
+
+@register("uniform")
+class UniformShape(RandomShape):
+    __slots__ = ()
+    METHOD = "uniform"
+
+@register("impulsive")
+class ImpulsiveShape(RandomShape):
+    __slots__ = ()
+
+    def generate_into(self, buffer, n):
+        return self.engine.impulsive(self.plan.magnitude, self.plan.impulse_probability, n, self.plan.spa, buffer)
+
+# The LRS register carries over from the previous packet, and jumps ahead
+# in closed form
+@register("lrs")
+class LrsShape(Shape):
+    __slots__ = ("lrs",)
+
+    def __init__(self, plan, waveform, tables):
+        Shape.__init__(self, plan, waveform, tables)
+        self.lrs = waveform.lrs_seed
+
+    def save(self):
+        return {"lrs": self.lrs}
+
+    def restore(self, carry, previous):
+        self.lrs = carry.get("lrs", self.lrs)
+
+    def seekable(self):
+        return True
+
+    def advance(self, n):
+        self.lrs = self.waveform.lrs_advance(self.lrs, n)
+
+    def generate_into(self, buffer, n):
+        data = self.waveform.lrs(self.plan.magnitude, n, self.plan.spa, self.lrs, buffer)
+        self.lrs = self.waveform.lrs_seed
+        return data
+
+# Counts up by one per element from -magnitude to magnitude
+@register("ramp")
+class RampShape(Shape):
+    __slots__ = ("value",)
+
+    def __init__(self, plan, waveform, tables):
+        Shape.__init__(self, plan, waveform, tables)
+        self.value = int(-plan.magnitude)
+
+    def save(self):
+        return {"ramp": self.value}
+
+    def restore(self, carry, previous):
+        self.value = carry.get("ramp", self.value)
+
+    def seekable(self):
+        return True
+
+    def advance(self, n):
+        self.value = self.waveform.ramp_advance(self.plan.magnitude, n, self.value)
+
+    def generate_into(self, buffer, n):
+        data, self.value = self.waveform.ramp(self.plan.magnitude, n, self.plan.spa, self.value, buffer)
+        return data
+
+# Plays a file in a loop. The mapping of the file is an engine: it is not
+# pickled, and a process the shape is sent to maps the file again.
+@register("file")
+class FileShape(Shape):
+    __slots__ = ("playback", "position")
+    ENGINE_SLOTS = Shape.ENGINE_SLOTS + ("playback",)
+
+    def __init__(self, plan, waveform, tables):
+        Shape.__init__(self, plan, waveform, tables)
+        # Element of the file the next packet starts at
+        self.position = 0
+        self.playback = self.open()
+
+    # Map the file of the plan
+    # @return the Playback
+    def open(self):
+        playback = Playback.Playback(self.plan.file_path, self.plan.file_type)
+        if playback.elements(self.plan.spa) == 0:
+            raise ValueError("%s holds no elements" % self.plan.file_path)
+        return playback
+
+    def attach(self, waveform, tables):
+        Shape.attach(self, waveform, tables)
+        if waveform is None:
+            self.playback = None
+        elif self.playback is None:
+            self.playback = self.open()
+
+    def save(self):
+        return {"file": (self.plan.file_path, self.position)}
+
+    # The same file carries on where it was
+    def restore(self, carry, previous):
+        path, position = carry.get("file", (None, 0))
+        if path == self.plan.file_path:
+            self.position = position % self.playback.elements(self.plan.spa)
+
+    def repeats(self):
+        return self.plan.xfer_len % self.playback.elements(self.plan.spa) == 0
+
+    def seekable(self):
+        return True
+
+    def advance(self, n):
+        self.position = (self.position + n) % self.playback.elements(self.plan.spa)
+
+    def generate_into(self, buffer, n):
+        plan = self.plan
+        data, self.position = self.playback.read(self.position, n, plan.spa, plan.file_scale, buffer)
+        return data
@@ -22,17 +22,272 @@
 # Source: SigGen.spd.xml
 from ossie.resource import Resource, start_component
 import logging
-import math
 from bulkio.bulkioInterfaces import BULKIO, BULKIO__POA 
 import Waveform
+import Wavetable
+import Shapes
+import Packet
+import Throttle
+import SampleClock
+import Plan
+import Properties
+import Parallel
 from omniORB import any
-from array import array
 import numpy as np
 
 from SigGen_base import *
+from ossie.properties import structseq_property
 
 class SigGen_i(SigGen_base):
     """<DESCRIPTION GOES HERE>"""
+    # Properties of the python implementation only
+    phase_accumulator = simple_property(id_="phase_accumulator",
+                                        type_="string",
+                                        defvalue=Properties.PYTHON_DEFAULTS["phase_accumulator"],
+                                        mode="readwrite",
+                                        action="external",
+                                        kinds=("configure",),
+                                        description="""Phase accumulator of the periodic waveforms. "float" uses the double precision accumulator, "nco" a fixed-point accumulator that does not drift, with the sine from a lookup table.""")
+    
+    nco_table_size = simple_property(id_="nco_table_size",
+                                     type_="long",
+                                     defvalue=Properties.PYTHON_DEFAULTS["nco_table_size"],
+                                     mode="readwrite",
+                                     action="external",
+                                     kinds=("configure",),
+                                     description="""Number of entries in one cycle of the sine table of the nco phase accumulator, rounded up to a power of two.""")
+    
+    nco_interpolate = simple_property(id_="nco_interpolate",
+                                      type_="boolean",
+                                      defvalue=Properties.PYTHON_DEFAULTS["nco_interpolate"],
+                                      mode="readwrite",
+                                      action="external",
+                                      kinds=("configure",),
+                                      description="""Interpolate linearly between the entries of the sine table of the nco phase accumulator.""")
+    
+    complex_output = simple_property(id_="complex_output",
+                                     type_="boolean",
+                                     defvalue=Properties.PYTHON_DEFAULTS["complex_output"],
+                                     mode="readwrite",
+                                     action="external",
+                                     kinds=("configure",),
+                                     description="""Output complex data, interleaved I and Q. Sine is cos + j*sin; the other shapes have the same value in I and Q.""")
+    
+    chirp_rate = simple_property(id_="chirp_rate",
+                                 type_="double",
+                                 defvalue=Properties.PYTHON_DEFAULTS["chirp_rate"],
+                                 mode="readwrite",
+                                 action="external",
+                                 kinds=("configure",),
+                                 description="""Sweep rate of the chirp shape, in Hz per second. The sweep starts at frequency.""")
+    
+    chirp_bandwidth = simple_property(id_="chirp_bandwidth",
+                                      type_="double",
+                                      defvalue=Properties.PYTHON_DEFAULTS["chirp_bandwidth"],
+                                      mode="readwrite",
+                                      action="external",
+                                      kinds=("configure",),
+                                      description="""Width of the sweep of the chirp shape, in Hz.""")
+    
+    chirp_mode = simple_property(id_="chirp_mode",
+                                 type_="string",
+                                 defvalue=Properties.PYTHON_DEFAULTS["chirp_mode"],
+                                 mode="readwrite",
+                                 action="external",
+                                 kinds=("configure",),
+                                 description="""What the chirp shape does at the end of a sweep. "repeat" starts over at frequency, "pingpong" sweeps back to it.""")
+    
+    prefetch_depth = simple_property(id_="prefetch_depth",
+                                     type_="long",
+                                     defvalue=Properties.PYTHON_DEFAULTS["prefetch_depth"],
+                                     mode="readwrite",
+                                     action="external",
+                                     kinds=("configure",),
+                                     description="""Number of packets generated ahead of the push by a producer thread. 0 generates each packet in the processing thread, just before it is pushed.""")
+    
+    class Channel(object):
+        shape = simple_property(id_="channels::shape",
+                                name="shape",
+                                type_="string",
+                                defvalue=Properties.CHANNEL_DEFAULTS["shape"])
+        
+        frequency = simple_property(id_="channels::frequency",
+                                    name="frequency",
+                                    type_="double",
+                                    defvalue=Properties.CHANNEL_DEFAULTS["frequency"])
+        
+        magnitude = simple_property(id_="channels::magnitude",
+                                    name="magnitude",
+                                    type_="double",
+                                    defvalue=Properties.CHANNEL_DEFAULTS["magnitude"])
+        
+        stream_id = simple_property(id_="channels::stream_id",
+                                    name="stream_id",
+                                    type_="string",
+                                    defvalue=Properties.CHANNEL_DEFAULTS["stream_id"])
+        
+        def __init__(self, shape=Properties.CHANNEL_DEFAULTS["shape"], frequency=Properties.CHANNEL_DEFAULTS["frequency"],
+                     magnitude=Properties.CHANNEL_DEFAULTS["magnitude"], stream_id=Properties.CHANNEL_DEFAULTS["stream_id"]):
+            self.shape = shape
+            self.frequency = frequency
+            self.magnitude = magnitude
+            self.stream_id = stream_id
+        
+        def __str__(self):
+            """Return a string representation of this structure"""
+            d = {}
+            d["shape"] = self.shape
+            d["frequency"] = self.frequency
+            d["magnitude"] = self.magnitude
+            d["stream_id"] = self.stream_id
+            return str(d)
+        
+        @classmethod
+        def getId(cls):
+            return "channels"
+        
+        @classmethod
+        def isStruct(cls):
+            return True
+        
+        def getMembers(self):
+            return [("shape",self.shape),("frequency",self.frequency),("magnitude",self.magnitude),("stream_id",self.stream_id)]
+    
+    workers = simple_property(id_="workers",
+                              type_="long",
+                              defvalue=Properties.PYTHON_DEFAULTS["workers"],
+                              mode="readwrite",
+                              action="external",
+                              kinds=("configure",),
+                              description="""Number of worker processes generating the packets, splitting the channels and long packets of seekable shapes into ranges. 0 generates them in the component.""")
+    
+    noise_engine = simple_property(id_="noise_engine",
+                                   type_="string",
+                                   defvalue=Properties.PYTHON_DEFAULTS["noise_engine"],
+                                   mode="readwrite",
+                                   action="external",
+                                   kinds=("configure",),
+                                   description="""Bit generator of the gaussian, uniform and impulsive shapes, "pcg64" or "philox". With NumPy before 1.17, both fall back to the Mersenne Twister.""")
+    
+    noise_seed = simple_property(id_="noise_seed",
+                                 type_="long",
+                                 defvalue=Properties.PYTHON_DEFAULTS["noise_seed"],
+                                 mode="readwrite",
+                                 action="external",
+                                 kinds=("configure",),
+                                 description="""Seed of the gaussian, uniform and impulsive shapes. Changing it starts the sequence over.""")
+    
+    noise_stream = simple_property(id_="noise_stream",
+                                   type_="long",
+                                   defvalue=Properties.PYTHON_DEFAULTS["noise_stream"],
+                                   mode="readwrite",
+                                   action="external",
+                                   kinds=("configure",),
+                                   description="""Stream of noise_seed used by the gaussian, uniform and impulsive shapes. The streams of a seed are independent; channel i uses stream noise_stream + i. The whitenoise shape of channel i starts stream noise_stream + i of its own generator.""")
+    
+    impulse_probability = simple_property(id_="impulse_probability",
+                                          type_="double",
+                                          defvalue=Properties.PYTHON_DEFAULTS["impulse_probability"],
+                                          mode="readwrite",
+                                          action="external",
+                                          kinds=("configure",),
+                                          description="""Probability of an impulse in each scalar of the impulsive shape. The impulses are gaussian with a standard deviation of magnitude.""")
+    
+    add_noise = simple_property(id_="add_noise",
+                                type_="boolean",
+                                defvalue=Properties.PYTHON_DEFAULTS["add_noise"],
+                                mode="readwrite",
+                                action="external",
+                                kinds=("configure",),
+                                description="""Add gaussian noise to the shape, at snr. The noise carries on the sequence of the whitenoise shape, and channel i adds the noise of stream noise_stream + i. It is added to the shapes whose power is known: the periodic shapes, chirp, multitone and constant.""")
+    
+    snr = simple_property(id_="snr",
+                          type_="double",
+                          defvalue=Properties.PYTHON_DEFAULTS["snr"],
+                          mode="readwrite",
+                          action="external",
+                          kinds=("configure",),
+                          description="""Ratio of the power of the shape to the power of the noise added to it, in dB.""")
+    
+    file_path = simple_property(id_="file_path",
+                                type_="string",
+                                defvalue=Properties.PYTHON_DEFAULTS["file_path"],
+                                mode="readwrite",
+                                action="external",
+                                kinds=("configure",),
+                                description="""File played in a loop by the file shape: a NumPy .npy file, a BLUE file, or raw scalars of file_type. It holds the scalars of the output, interleaved I and Q for complex_output. The file is memory-mapped, not loaded.""")
+    
+    file_type = simple_property(id_="file_type",
+                                type_="string",
+                                defvalue=Properties.PYTHON_DEFAULTS["file_type"],
+                                mode="readwrite",
+                                action="external",
+                                kinds=("configure",),
+                                description="""Type of the scalars of a raw file_path, "float" (float32) or "short" (int16).""")
+    
+    file_scaled = simple_property(id_="file_scaled",
+                                  type_="boolean",
+                                  defvalue=Properties.PYTHON_DEFAULTS["file_scaled"],
+                                  mode="readwrite",
+                                  action="external",
+                                  kinds=("configure",),
+                                  description="""Multiply the samples of the file shape by magnitude. Otherwise they are output as they are in the file.""")
+    
+    class Tone(object):
+        frequency = simple_property(id_="tones::frequency",
+                                    name="frequency",
+                                    type_="double",
+                                    defvalue=Properties.TONE_DEFAULTS["frequency"])
+        
+        amplitude = simple_property(id_="tones::amplitude",
+                                    name="amplitude",
+                                    type_="double",
+                                    defvalue=Properties.TONE_DEFAULTS["amplitude"])
+        
+        phase = simple_property(id_="tones::phase",
+                                name="phase",
+                                type_="double",
+                                defvalue=Properties.TONE_DEFAULTS["phase"])
+        
+        def __init__(self, frequency=Properties.TONE_DEFAULTS["frequency"], amplitude=Properties.TONE_DEFAULTS["amplitude"],
+                     phase=Properties.TONE_DEFAULTS["phase"]):
+            self.frequency = frequency
+            self.amplitude = amplitude
+            self.phase = phase
+        
+        def __str__(self):
+            """Return a string representation of this structure"""
+            d = {}
+            d["frequency"] = self.frequency
+            d["amplitude"] = self.amplitude
+            d["phase"] = self.phase
+            return str(d)
+        
+        @classmethod
+        def getId(cls):
+            return "tones"
+        
+        @classmethod
+        def isStruct(cls):
+            return True
+        
+        def getMembers(self):
+            return [("frequency",self.frequency),("amplitude",self.amplitude),("phase",self.phase)]
+    
+    tones = structseq_property(id_="tones",
+                               structdef=Tone,
+                               defvalue=[],
+                               mode="readwrite",
+                               kinds=("configure",),
+                               description="""Tones of the multitone shape, which outputs the sum of their sines. The amplitude of each tone is relative to magnitude, and its phase, in cycles, is that of its first element.""")
+    
+    channels = structseq_property(id_="channels",
+                                  structdef=Channel,
+                                  defvalue=[],
+                                  mode="readwrite",
+                                  kinds=("configure",),
+                                  description="""Channels generated together, each pushed as its own stream with the sample_rate, xfer_len and time stamps of the component. An empty stream_id is stream_id followed by the index of the channel. With no channels, the component generates the single stream set by shape, frequency, magnitude and stream_id.""")
+    
     def initialize(self):
         """
         This is called by the framework immediately after your component registers with the NameService.
@@ -43,39 +298,68 @@ class SigGen_i(SigGen_base):
           self.some_port = MyPortImplementation()
         """
         SigGen_base.initialize(self)
-        self.last_xfer_len = self.xfer_len
-        
-        keywords = []
-        if self.chan_rf != -1:
-            keywords.append(CF.DataType('CHAN_RF', any.to_any(self.chan_rf)))
-        if self.col_rf != -1:
-            keywords.append(CF.DataType('COL_RF', any.to_any(self.col_rf)))
-        if self.sri_blocking == None:
-            self.sri_blocking = False
-        self.sri = BULKIO.StreamSRI(1, 0.0, 0.0, BULKIO.UNITS_TIME, 0, 0.0, 0.0, BULKIO.UNITS_NONE, 0, self.stream_id, self.sri_blocking, keywords)
-        self.sriUpdate = True
-        self.phase = 0
-        self.chirp = 0
-        self.sample_time_delta = 0.0
-        self.delta_phase = 0.0
-        self.delta_phase_offset = 0.0
-        self.cached_stream_id=self.stream_id
-        self.stream_created=False
+        
         self.next_time = None
         
         self._waveform = Waveform.Waveform()
+        # Output buffer the waveform is generated into, reused every packet
+        self._float_buffer = np.empty(0, dtype=np.float32)
+        self._short_buffer = np.empty(0, dtype=np.int16)
+        # Buffer the float data is saturated in before it is made short
+        self._clip_buffer = np.empty(0, dtype=np.float32)
+        # Tables for periodic waveforms that repeat every few samples
+        self._wavetables = Wavetable.WavetableCache(self._waveform)
+        # Generator of each channel of the last packet, holding the running
+        # state of its shape
+        self._generators = []
+        # Packet pushed again while every packet is identical, until the
+        # version of the plan changes
+        self._packet = None
+        # Producer thread and the queue of packets it generated, while
+        # prefetch_depth > 0
+        self._producer = None
+        self._producer_stop = None
+        self._prefetch = None
+        # Pool of worker processes, while workers > 0
+        self._parallel = None
+        # Paces the output at the sample rate
+        self._throttle = Throttle.Throttle()
+        # Time stamps the packets from the number of elements output
+        self._clock = SampleClock.SampleClock(None, self.sample_rate)
+        
+        # Plan the packets are generated with, compiled again whenever a
+        # property it depends on changes
+        self._plan_lock = threading.Lock()
+        self._plan = None
+        # Plan whose SRIs were pushed last, and the SRI of each stream it
+        # pushed
+        self._pushed_plan = None
+        self._streams = {}
+        self.compile_plan(True)
 
         # Separate listeners required. Bug fixed in CF 1.10.1
         self.addPropertyChangeListener("stream_id", self.prop_update_sri)
         self.addPropertyChangeListener("chan_rf", self.prop_update_sri2)
         self.addPropertyChangeListener("col_rf", self.prop_update_sri3)
         self.addPropertyChangeListener("sri_blocking", self.prop_update_sri_blocking)
+        for prop in ("shape", "magnitude", "frequency", "sample_rate", "xfer_len",
+                     "phase_accumulator", "nco_table_size", "nco_interpolate", "complex_output",
+                     "chirp_rate", "chirp_bandwidth", "chirp_mode", "tones", "noise_engine", "noise_seed", "noise_stream",
+                     "impulse_probability", "add_noise", "snr", "file_path", "file_type", "file_scaled", "channels"):
+            self.addPropertyChangeListener(prop, self.prop_update_waveform)
 
     def start(self):
         if not self._get_started():
             self.next_time = bulkio.timestamp.now()
+            self._clock.reset(self.next_time, self._plan.sample_rate)
+            self._throttle.reset()
         SigGen_base.start(self)
 
+    def stop(self):
+        SigGen_base.stop(self)
+        self.stop_producer()
+        self.stop_parallel()
+
     def process(self):
         """
         Basic functionality:
@@ -85,121 +369,290 @@ class SigGen_i(SigGen_base):
             FINISH or stop() is called on the component.  If no work is performed, then return NOOP.
         """
 
-        if self.stream_id == None:
-            self.stream_id = str(uuid.uuid4())
-            self.sri.streamID = self.stream_id
+        if self.prefetch_depth > 0:
+            # The producer thread generates the packets
+            queue = self.start_producer(self.prefetch_depth)
+            try:
+                packet = queue.get(timeout=self.PAUSE)
+            except Queue.Empty:
+                return NOOP
+        else:
+            self.stop_producer()
+            packet = self.next_packet()
+            if packet is None:
+                return NOOP
 
-        if self.xfer_len != self.last_xfer_len:
-            self.last_xfer_len = self.xfer_len
-            self.sriUpdate = True
+        # Drop packets generated before the last change to the waveform
+        plan = self._plan
+        if packet.plan.version != plan.version:
+            return NORMAL
+        
+        self._clock.set_rate(plan.sample_rate)
+        self.next_time = self._clock.time()
+            
+        if plan is not self._pushed_plan:
+            self.push_sri(plan)
+        
+        # Push the data, one row per channel. omniORB only marshals
+        # sequences from lists, so the buffer is converted once, at the port.
+        floatData = packet.float_list
+        if floatData is None:
+            floatData = packet.data.tolist()
+        for channel, data in zip(plan.channels, floatData):
+            self.port_dataFloat_out.pushPacket(data, self.next_time, False, channel.sri.streamID)
+        
+        # Only convert and push short data if the port is connected
+        if self.port_dataShort_out._get_state() == BULKIO.ACTIVE:
+            shortData = packet.short_list
+            if shortData is None:
+                shortData = self.short_list(packet)
+            for channel, data in zip(plan.channels, shortData):
+                self.port_dataShort_out.pushPacket(data, self.next_time, False, channel.sri.streamID)
+        
+        # Advance time
+        self._clock.advance(plan.xfer_len)
+        
+        # If we are throttling, wait for the end of the packet...otherwise run
+        # at full speed
+        if self.throttle:
+            lag = self._throttle.wait(plan.xfer_len, plan.xdelta)
+            if lag > self._throttle.MAX_LAG:
+                self._log.warn("Output fell %.3f s behind the sample rate, throttle restarted" % lag)
+        else:
+            self._throttle.reset()
+            
+        return NORMAL
+    
+    # Push the SRI of every channel of a plan, and EOS for the streams it no
+    # longer has
+    def push_sri(self, plan):
+        streams = dict((channel.sri.streamID, channel.sri) for channel in plan.channels)
+        for streamID in self._streams:
+            if streamID not in streams:
+                self.port_dataFloat_out.pushPacket([], self.next_time, True, streamID)
+                self.port_dataShort_out.pushPacket([], self.next_time, True, streamID)
+        for channel in plan.channels:
+            self.port_dataFloat_out.pushSRI(channel.sri)
+            self.port_dataShort_out.pushSRI(channel.sri)
+        self._streams = streams
+        self._pushed_plan = plan
+    
+    # Compile the properties into a new plan and make it current
+    # @param waveform The waveform changed, not only the SRI: packets
+    #                 generated with the previous plan are dropped
+    def compile_plan(self, waveform):
+        with self._plan_lock:
+            previous = self._plan
+            version = 0
+            if previous is not None:
+                version = previous.version + (1 if waveform else 0)
             
-        self.sample_time_delta = 1.0/self.sample_rate
-        if self.sample_time_delta != self.sri.xdelta:
-            self.sri.xdelta = self.sample_time_delta
-            self.sriUpdate = True
+            if self.stream_id == None:
+                self.stream_id = str(uuid.uuid4())
+            if self.sri_blocking == None:
+                self.sri_blocking = False
             
-        if self.sriUpdate or not self.port_dataFloat_out.sriDict.has_key(self.cached_stream_id) or not self.port_dataShort_out.sriDict.has_key(self.cached_stream_id):
-            self.sriUpdate = False
+            specs = Plan.channel_specs(self)
             
-            # Send EOS if necessary
-            if self.stream_id != self.cached_stream_id and self.stream_created:
-                self.port_dataFloat_out.pushPacket([], self.next_time, True, self.cached_stream_id)
-                self.port_dataShort_out.pushPacket([], self.next_time, True, self.cached_stream_id)
-            self.cached_stream_id = self.stream_id
-        
             keywords = []
             if self.chan_rf != -1:
                 keywords.append(CF.DataType('CHAN_RF', any.to_any(self.chan_rf)))
             if self.col_rf != -1:
                 keywords.append(CF.DataType('COL_RF', any.to_any(self.col_rf)))
-            self.sri.keywords = keywords
-            self.stream_created = True
-            self.port_dataFloat_out.pushSRI(self.sri)
-            self.port_dataShort_out.pushSRI(self.sri)
             
-        self.delta_phase = self.frequency * self.sample_time_delta
-        self.delta_phase_offset = self.chirp * self.sample_time_delta * self.sample_time_delta
-        if ((self.delta_phase < 0) and (not self.shape == "sine")):
-            self.delta_phase = -self.delta_phase
+            channels = []
+            for i, spec in enumerate(specs):
+                channel = self.compile_channel(version, i, spec, keywords)
+                # The generators are kept while only the SRI changes
+                if previous is not None and not waveform:
+                    generator = previous.channels[i].generator
+                else:
+                    try:
+                        generator = Shapes.create(channel, self._waveform, self._wavetables)
+                    except (EnvironmentError, ValueError), e:
+                        self._log.error("Can not generate the %s shape: %s" % (channel.shape, e))
+                        generator = None
+                repeats = generator is not None and generator.repeats() and generator.noise_deviation() == 0.0
+                channels.append(channel._replace(generator=generator, repeats=repeats))
             
-        # Generate the Waveform
-        data = []
-        if self.shape == "sine":
-            data = self._waveform.sincos(self.magnitude, self.phase, self.delta_phase, self.last_xfer_len, 1)
-        elif self.shape == "square":
-            data = self._waveform.square(self.magnitude, self.phase, self.delta_phase, self.last_xfer_len, 1)
-        elif self.shape == "triangle":
-            data = self._waveform.triangle(self.magnitude, self.phase, self.delta_phase, self.last_xfer_len, 1)
-        elif self.shape == "sawtooth":
-            data = self._waveform.sawtooth(self.magnitude, self.phase, self.delta_phase, self.last_xfer_len, 1)
-        elif self.shape == "pulse":
-            data = self._waveform.pulse(self.magnitude, self.phase, self.delta_phase, self.last_xfer_len, 1)
-        elif self.shape == "constant":
-            data = self._waveform.constant(self.magnitude, self.last_xfer_len, 1)
-        elif self.shape == "whitenoise":
-            data = self._waveform.whitenoise(self.magnitude, self.last_xfer_len, 1)
-        elif self.shape == "lrs":
-            data = self._waveform.lrs(self.magnitude, self.last_xfer_len, 1, 1)
-        else:
-            return NOOP
-  
-        self.phase += self.delta_phase*self.last_xfer_len # increment phase
-        self.phase -= math.floor(self.phase) # module 1.0
+            # The plan is that of the first channel, with the plans of all of
+            # them
+            repeats = all(channel.repeats for channel in channels)
+            self._plan = channels[0]._replace(repeats=repeats, channels=tuple(channels))
+    
+    # Compile the plan of one channel, without its generator
+    # @param version  Version of the waveform
+    # @param index    Index of the channel
+    # @param spec     Shape, frequency, magnitude and stream ID of the channel
+    # @param keywords Keywords of the SRI
+    def compile_channel(self, version, index, spec, keywords):
+        plan = Plan.compile_channel(self, version, index, spec)
+        sri = BULKIO.StreamSRI(1, 0.0, plan.xdelta, BULKIO.UNITS_TIME, 0, 0.0, 0.0, BULKIO.UNITS_NONE, plan.spa - 1, spec[3], self.sri_blocking, keywords)
+        return plan._replace(sri=sri)
+    
+    # Get the next packet: the repeated packet, or a newly generated one
+    # @param lists Also convert the data to lists, and do not keep the
+    #              buffer it was generated in
+    # @return the Packet, or None if the shape of a channel is unknown
+    def next_packet(self, lists=False):
+        plan = self._plan
+        packet = self._packet
+        if packet is not None and packet.plan.version == plan.version:
+            # The channels move on as if the packet was generated again: the
+            # fixed-point accumulator of the NCO does not come back exactly
+            # to where it was
+            for generator in self._generators:
+                generator.skip(plan.xfer_len)
+            return packet
+        generators = [channel.generator for channel in plan.channels]
+        if None in generators:
+            return None
         
-        # Push the data
-        self.port_dataFloat_out.pushPacket(data, self.next_time, False, self.cached_stream_id)
+        # One row per channel
+        self._float_buffer = Shapes.packet_buffer(self._float_buffer, len(generators), plan.size)
+        if self._short_buffer.shape != self._float_buffer.shape:
+            self._short_buffer = np.empty(self._float_buffer.shape, dtype=np.int16)
+            self._clip_buffer = np.empty(self._float_buffer.shape, dtype=np.float32)
         
-        # Only convert and push short data if the port is connected
-        if self.port_dataShort_out._get_state() == BULKIO.ACTIVE:
-            self.port_dataShort_out.pushPacket(self.convert_float_2_short(data), 
-                                           self.next_time, False, self.cached_stream_id)
+        self._generators = Shapes.take_over(self._generators, generators)
         
-        # Advance time
-        self.next_time.tfsec += self.last_xfer_len * self.sri.xdelta
-        if self.next_time.tfsec > 1.0:
-            self.next_time.tfsec -= 1.0
-            self.next_time.twsec += 1.0
+        parallel = None
+        if self.workers > 0:
+            parallel = self.start_parallel(self.workers)
+        else:
+            self.stop_parallel()
+        data = Shapes.generate_packet(generators, self._float_buffer, plan.xfer_len, parallel)
         
-        # If we are throttling, wait...otherwise run at full speed
-        if self.throttle:
-            wait_amt = self.last_xfer_len * self.sample_time_delta
+        packet = Packet.Packet(data, plan)
+        if plan.repeats:
+            # Keep a copy, the buffers are overwritten by the next packet
+            packet.data = np.array(data)
+            packet.data.flags.writeable = False
+            packet.float_list = packet.data.tolist()
+            self._packet = packet
+        elif lists:
+            packet.float_list = data.tolist()
+            if self.port_dataShort_out._get_state() == BULKIO.ACTIVE:
+                packet.short_list = self.convert_float_2_short(data, self._short_buffer, self._clip_buffer).tolist()
+            packet.data = None
+        return packet
+    
+    # Start the worker processes, unless they are running with the same
+    # number of workers
+    # @return the ParallelGenerator
+    def start_parallel(self, workers):
+        if self._parallel is not None:
+            if self._parallel.workers == workers:
+                return self._parallel
+            self.stop_parallel()
+        self._parallel = Parallel.ParallelGenerator(workers)
+        return self._parallel
+    
+    # Stop the worker processes
+    def stop_parallel(self):
+        if self._parallel is None:
+            return
+        self._parallel.close()
+        self._parallel = None
+    
+    # Get the short data of a packet as a list, keeping it if the packet is
+    # pushed again
+    def short_list(self, packet):
+        # The producer thread converts into the short buffer
+        out = scratch = None
+        if self._producer is None:
+            out = self._short_buffer
+            scratch = self._clip_buffer
+        if packet.data is not None:
+            shortData = self.convert_float_2_short(packet.data, out, scratch).tolist()
+        else:
+            shortData = self.convert_float_2_short(packet.float_list, out, scratch).tolist()
+        if packet is self._packet:
+            packet.short_list = shortData
+        return shortData
+    
+    # Start the producer thread, unless it is running with the same depth
+    # @param depth Number of packets in the queue
+    # @return the queue the packets are put in
+    def start_producer(self, depth):
+        if self._producer is not None:
+            if self._prefetch.maxsize == depth:
+                return self._prefetch
+            self.stop_producer()
+        self._prefetch = Queue.Queue(depth)
+        self._producer_stop = threading.Event()
+        self._producer = threading.Thread(target=self.produce, args=(self._prefetch, self._producer_stop))
+        self._producer.setDaemon(True)
+        self._producer.start()
+        return self._prefetch
+    
+    # Stop the producer thread and drop the packets it generated
+    def stop_producer(self):
+        if self._producer is None:
+            return
+        self._producer_stop.set()
+        self._producer.join(self.TIMEOUT)
+        self._producer = None
+        self._prefetch = None
+    
+    # Body of the producer thread: generate packets into the queue until
+    # told to stop. NumPy releases the GIL for most of the generation, so
+    # this overlaps with the push in the processing thread.
+    def produce(self, queue, stop):
+        while not stop.isSet():
             try:
-                time.sleep(wait_amt)
-            finally:
-                return NORMAL
-            
-        return NORMAL
+                packet = self.next_packet(True)
+            except Exception:
+                self._log.exception("Error generating packet")
+                packet = None
+            if packet is None:
+                stop.wait(self.PAUSE)
+                continue
+            while not stop.isSet() and packet.plan.version == self._plan.version:
+                try:
+                    queue.put(packet, timeout=self.PAUSE)
+                    break
+                except Queue.Full:
+                    pass
     
-    def convert_float_2_short(self, data):
-        shortData = array("h")
-        shortMin = np.iinfo(np.int16).min
-        shortMax = np.iinfo(np.int16).max
-                
-        for i in range(len(data)):
-            shortData.append(np.int16(min(shortMax, max(shortMin, np.float32(data[i])))))
-             
-        return shortData.tolist()
+    # Saturate the float data to the range of a short and truncate it toward
+    # zero, in one pass over the whole buffer
+    # @param data    The float32 data
+    # @param out     Optional int16 array to write the result to
+    # @param scratch Optional float32 array the data is saturated in
+    # @return the int16 data
+    def convert_float_2_short(self, data, out=None, scratch=None):
+        return Packet.to_short(data, out, scratch)
         
     def prop_update_sri(self, propid, oldval, newval):
-        self.sri.streamID = self.stream_id
-        self.sriUpdate = True
+        self.compile_plan(False)
 
     def prop_update_sri2(self, propid, oldval, newval):
-        self.sriUpdate = True
+        self.compile_plan(False)
 
     def prop_update_sri3(self, propid, oldval, newval):
-        self.sriUpdate = True
+        self.compile_plan(False)
+
+    # Compile a new plan when the waveform changes, and drop the packets
+    # generated ahead with the old one
+    def prop_update_waveform(self, propid, oldval, newval):
+        self.compile_plan(True)
+        queue = self._prefetch
+        while queue is not None:
+            try:
+                queue.get_nowait()
+            except Queue.Empty:
+                break
 
     # Check for changes to the SRI Blocking property
     def prop_update_sri_blocking(self, propid, oldval, newval):
-        if newval != None:
-            self.sri.blocking = newval
-        elif oldval != None:
-            self.sri.blocking = oldval
-        else:
-            self.sri.blocking = False
+        if newval == None:
+            if oldval != None:
+                self.sri_blocking = oldval
+            else:
+                self.sri_blocking = False
             
-        self.sriUpdate = True
+        self.compile_plan(False)
         
 if __name__ == '__main__':
     logging.getLogger().setLevel(logging.WARN)
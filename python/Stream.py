@@ -0,0 +1,189 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Stream generates the packets of SigGen without CORBA.
+
+It is configured with the properties of the component, by id, and
+generates exactly what the component would push: the same Plans and
+Shapes generators, with the running state carried from packet to packet
+and across changes of configuration, and the time stamps of SampleClock.
+Iterating over a Stream gives the data, time stamp and SRI of each packet
+of each channel, in the order the component pushes them:
+
+    stream = Stream.Stream(shape="chirp", sample_rate=1e6, xfer_len=65536)
+    for data, time, sri in stream.packets(100):
+        ...
+
+The data of a packet is a view of a buffer that the next packet is
+generated into, or of the data of the shape (a table, a mapped file);
+copy it to keep it.
+'''
+import collections
+import math
+import time
+import numpy as np
+import Parallel
+import Plan
+import Properties
+import SampleClock
+import Shapes
+import Waveform
+import Wavetable
+
+# Elements of the tones and channels properties
+Tone = collections.namedtuple("Tone", ["frequency", "amplitude", "phase"])
+Tone.__new__.__defaults__ = tuple(Properties.TONE_DEFAULTS[name] for name in Tone._fields)
+Channel = collections.namedtuple("Channel", ["shape", "frequency", "magnitude", "stream_id"])
+Channel.__new__.__defaults__ = tuple(Properties.CHANNEL_DEFAULTS[name] for name in Channel._fields)
+
+# The fields of a BULKIO.StreamSRI, with the keywords as a dict
+SRI = collections.namedtuple("SRI", ["hversion", "xstart", "xdelta", "xunits", "subsize", "ystart", "ydelta",
+                                     "yunits", "mode", "streamID", "blocking", "keywords"])
+
+# BULKIO units of the SRI
+UNITS_NONE = 0
+UNITS_TIME = 1
+
+# Time of an element, with the whole and fractional seconds of a
+# BULKIO.PrecisionUTCTime
+class Time:
+    def __init__(self, twsec=0.0, tfsec=0.0):
+        self.twsec = twsec
+        self.tfsec = tfsec
+
+    # Create the time of a number of seconds since the epoch
+    @classmethod
+    def from_seconds(cls, seconds):
+        twsec = math.floor(seconds)
+        return cls(twsec, seconds - twsec)
+
+    def seconds(self):
+        return self.twsec + self.tfsec
+
+    def __repr__(self):
+        return "Time(%r, %r)" % (self.twsec, self.tfsec)
+
+class Stream:
+    # Properties of the component and their default values. throttle and
+    # prefetch_depth only pace and buffer the push, so are not needed.
+    DEFAULTS = dict((name, value) for name, value in Properties.defaults().items()
+                    if name not in ("throttle", "prefetch_depth"))
+
+    # @param start Time of the first element, in seconds since the epoch;
+    #              now if None
+    # @param props Properties of the component, by id
+    def __init__(self, start=None, **props):
+        for name, value in self.DEFAULTS.items():
+            setattr(self, name, value)
+        self._waveform = Waveform.Waveform()
+        self._wavetables = Wavetable.WavetableCache(self._waveform)
+        self._buffer = np.empty(0, dtype=np.float32)
+        self._generators = []
+        self._parallel = None
+        self._plan = None
+        if start is None:
+            start = time.time()
+        self._clock = SampleClock.SampleClock(Time.from_seconds(start), self.DEFAULTS["sample_rate"])
+        self.configure(**props)
+
+    # Change properties. The generators carry on from the running state
+    # of the ones before, as in the component.
+    # @param props Properties of the component, by id
+    def configure(self, **props):
+        for name, value in props.items():
+            if name not in self.DEFAULTS:
+                raise ValueError("unknown property %s" % name)
+            if name == "tones":
+                value = tuple(Tone(*tone) for tone in value)
+            elif name == "channels":
+                value = tuple(Channel(*channel) for channel in value)
+            setattr(self, name, value)
+        self.compile_plan()
+
+    # Compile the properties into a new plan
+    def compile_plan(self):
+        version = 0 if self._plan is None else self._plan.version + 1
+        keywords = {}
+        if self.chan_rf != -1:
+            keywords["CHAN_RF"] = self.chan_rf
+        if self.col_rf != -1:
+            keywords["COL_RF"] = self.col_rf
+        
+        channels = []
+        for i, spec in enumerate(Plan.channel_specs(self)):
+            channel = Plan.compile_channel(self, version, i, spec)
+            generator = Shapes.create(channel, self._waveform, self._wavetables)
+            if generator is None:
+                raise ValueError("unknown shape %s" % channel.shape)
+            sri = SRI(1, 0.0, channel.xdelta, UNITS_TIME, 0, 0.0, 0.0, UNITS_NONE, channel.spa - 1, spec[3],
+                      self.sri_blocking, keywords)
+            channels.append(channel._replace(generator=generator, sri=sri))
+        self._plan = channels[0]._replace(channels=tuple(channels))
+        self._clock.set_rate(self._plan.sample_rate)
+
+    # Get the plan the next packet is generated with
+    def plan(self):
+        return self._plan
+
+    # Get the time of the next element
+    def next_time(self):
+        return self._clock.time()
+
+    # Generate the next packet of every channel
+    # @return a float32 array with a row for each channel, which the next
+    #         packet overwrites, and the time of its first element
+    def next_packet(self):
+        plan = self._plan
+        generators = [channel.generator for channel in plan.channels]
+        self._generators = Shapes.take_over(self._generators, generators)
+        
+        if self.workers > 0:
+            if self._parallel is None or self._parallel.workers != self.workers:
+                self.close()
+                self._parallel = Parallel.ParallelGenerator(self.workers)
+        else:
+            self.close()
+        self._buffer = Shapes.packet_buffer(self._buffer, len(generators), plan.size)
+        data = Shapes.generate_packet(generators, self._buffer, plan.xfer_len, self._parallel)
+        
+        stamp = self._clock.time()
+        self._clock.advance(plan.xfer_len)
+        return data, stamp
+
+    # Generate packets
+    # @param count Number of packets, or None for no end
+    # @return an iterator over the data, time stamp and SRI of each packet
+    #         of each channel
+    def packets(self, count=None):
+        while count is None or count > 0:
+            plan = self._plan
+            data, stamp = self.next_packet()
+            for channel, row in zip(plan.channels, data):
+                yield row, stamp, channel.sri
+            if count is not None:
+                count -= 1
+
+    def __iter__(self):
+        return self.packets()
+
+    # Stop the worker processes
+    def close(self):
+        if self._parallel is None:
+            return
+        self._parallel.close()
+        self._parallel = None
@@ -0,0 +1,103 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+Throttle paces the output at the sample rate.
+
+Deadlines are absolute: the end of the packets pushed so far is the time
+the pacing started plus the number of elements pushed since, times the time
+between elements. Time spent generating and pushing a packet comes out of
+the wait, so the average rate is the sample rate however long the stream
+runs. The wait sleeps until shortly before the deadline and spins for the
+rest, as sleep is only accurate to about a millisecond. The spin is at most
+a tenth of the packet, and yields to the other threads while it lasts, so
+short packets do not keep the interpreter busy.
+
+Python 2 has no monotonic clock, and time.time jumps when the system time
+is set. A packet is never waited for longer than its own duration: a
+deadline further away than that means the clock went back, and the pacing
+starts over from the current time.
+'''
+import time
+
+class Throttle:
+    # Time before a deadline spent spinning instead of sleeping, in seconds,
+    # and the largest part of a packet it may take
+    SPIN = 0.002
+    SPIN_SHARE = 0.1
+
+    # How far behind the deadlines the output may fall before the pacing
+    # starts over from the current time, in seconds
+    MAX_LAG = 1.0
+
+    # @param clock Function returning a monotonic time, in seconds
+    # @param sleep Function sleeping for a time, in seconds
+    def __init__(self, clock=None, sleep=time.sleep):
+        if clock is None:
+            clock = getattr(time, "monotonic", time.time)
+        self.clock = clock
+        self.sleep = sleep
+        self.reset()
+
+    # Start the pacing over with the next packet
+    def reset(self):
+        self.epoch = None
+        self.xdelta = None
+        self.count = 0
+
+    # Wait for the end of a packet that was just pushed
+    # @param n      Number of elements in the packet
+    # @param xdelta Time between elements, in seconds
+    # @return how far behind its deadline the packet was, in seconds; 0 if
+    #         it was on time
+    def wait(self, n, xdelta):
+        now = self.clock()
+        if self.epoch is not None and now < self.epoch:
+            # The clock went back past the start of the pacing
+            self.reset()
+        if self.epoch is None:
+            self.epoch = now
+        elif xdelta != self.xdelta:
+            # The sample rate changed: the count starts over at the end of
+            # the last packet
+            self.epoch += self.count*self.xdelta
+            self.count = 0
+        self.xdelta = xdelta
+        self.count += n
+        deadline = self.epoch + self.count*xdelta
+        if deadline - now > n*xdelta:
+            # The clock went back since the last packet
+            self.epoch = now
+            self.count = n
+            deadline = now + n*xdelta
+
+        lag = now - deadline
+        if lag >= 0:
+            if lag > self.MAX_LAG:
+                self.epoch = now
+                self.count = 0
+            return lag
+
+        spin = min(self.SPIN, n*xdelta*self.SPIN_SHARE)
+        if deadline - now > spin:
+            self.sleep(deadline - now - spin)
+        while True:
+            current = self.clock()
+            if current >= deadline or current < now:
+                break
+            self.sleep(0)
+        return 0.0
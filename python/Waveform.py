@@ -46,16 +46,402 @@ class Waveform:
     # Value: = 1G = 2^30
     B1G  = 1073741824.
     
+    # Integer form of the A/BI/T26 generator used by whitenoise: each draw
+    # is sis = k/T26 with k' = (A*k + B) mod 2^26, which doubles represent
+    # exactly. The vectorized engine advances it LCG_BLOCK draws at a time.
+    LCG_MASK = (1 << 26) - 1
+    LCG_BLOCK = 4096
+    lcg_tables = None
+    # Draws between the starts of two whitenoise streams. It is odd, so the
+    # streams start apart for as many streams as the 2^26 draws of the
+    # period, and near the golden ratio of the period, so they are spread
+    # over it.
+    STREAM_STRIDE = 41475591
+    
+    # The LRS is a 32 bit shift register whose new low bit is
+    # ~(b0 ^ b1 ^ b5 ^ b25). The vectorized engine shifts in 32 bits per
+    # step with byte transition tables, LRS_BLOCK words at a time.
+    LRS_MASK = 0xffffffff
+    LRS_BLOCK = 64
+    lrs_tables = None
+    # Affine maps of the register over 2**k elements, for lrs_advance
+    lrs_powers = None
+    # LRS register at the end of the last lrs call
+    lrs_seed = 1
+    
+    # Largest difference, relative to the amplitude, allowed between the
+    # vectorized engine and the scalar recurrence when verify is enabled
+    VERIFY_TOLERANCE = 1e-6
+    # Distance to a boundary, per element of the call, under which the
+    # exact phase of an element may be on the other side of the boundary
+    # from the phase of the scalar accumulator: each addition of the
+    # accumulator, and the exact phase itself, round by at most 2^-53 per
+    # element
+    BOUNDARY_TOLERANCE = 2.0**-48
+    # Shortest cycle, in elements, accumulated with NumPy a cycle at a time;
+    # shorter cycles are accumulated in a plain loop
+    ACCUMULATE_RUN = 32
+    
+    # @param vectorized Use the NumPy engine (float32 ndarray output) when
+    #                   available, otherwise the scalar per-sample loops
+    # @param verify     Also run the scalar engine and check that both agree
+    def __init__(self, vectorized=True, verify=False):
+        self.vectorized = vectorized
+        self.verify = verify
+    
     def setSeed(self, value):
         if value > 0: self.seed = value
+    
+    # The vectorized generators compute the phase of each element as
+    # p + i*dp, where the scalar accumulators add dp once per element and
+    # round each time. Both agree but on the elements whose phase lands on a
+    # boundary of the waveform (dp = 0.1 reaches 0.5 and 1.0 every 5
+    # elements), where the rounding of the accumulator decides the side. The
+    # square, sawtooth and pulse replay the accumulator when an element is
+    # that close to a boundary, so they wrap where the scalar code does.
+    
+    # Create the phase (in cycles, modulo 1.0) of each element
+    # @param p    Phase
+    # @param dp   Delta Phase
+    # @param n    Number of elements
+    # @return a float64 array of n phases in [0, 1)
+    def phase_ramp(self, p, dp, n):
+        phase = np.arange(n, dtype=np.float64)
+        phase *= dp
+        phase += p
+        phase -= np.floor(phase)
+        return phase
+    
+    # Create the phase of each element, marking where the phase reaches 1.0
+    # and wraps, as the scalar accumulators do
+    # @param p    Phase, 0 <= p < 1
+    # @param dp   Delta Phase, 0 <= dp < 1
+    # @param n    Number of elements
+    # @return the phase in [0, 1) of each element and a boolean array that
+    #         is True for the elements where the accumulator wrapped
+    def wrapped_ramp(self, p, dp, n):
+        phase = np.arange(n, dtype=np.float64)
+        phase *= dp
+        phase += p
+        cycles = np.floor(phase)
+        wrapped = np.zeros(n, dtype=bool)
+        np.greater(cycles[1:], cycles[:-1], out=wrapped[1:])
+        phase -= cycles
+        return phase, wrapped
+    
+    # The vectorized square, triangle, sawtooth and pulse generators cover the
+    # phase range used by SigGen_i.process; anything else runs the scalar code
+    def vectorizable(self, p, dp, spa):
+        return self.vectorized and 0.0 <= p < 1.0 and 0.0 <= dp < 1.0 and spa in (1, 2)
+    
+    # Get the float32 array a vectorized generator writes to
+    # @param out  Preallocated output array, or None to allocate a new one
+    # @param size Number of scalars
+    def output(self, out, size):
+        if out is None:
+            return np.empty(size, dtype=np.float32)
+        if len(out) != size:
+            raise ValueError("output array has %d elements, expected %d" % (len(out), size))
+        return out
+    
+    # Copy the output of a scalar generator into out, if given
+    def scalar_output(self, data, out):
+        if out is None:
+            return data
+        out[:] = data
+        return out
+    
+    # Copy one value per element into a float32 array, repeating it for
+    # both scalars of a complex element
+    # @return a contiguous float32 ndarray
+    def to_float32(self, value, spa, out=None):
+        outbuff = self.output(out, len(value)*spa)
+        for i in range(spa):
+            outbuff[i::spa] = value
+        return outbuff
+    
+    # Check if the phase of an element may be on the other side of a
+    # boundary of the waveform for the scalar accumulator
+    # @param phase  Phases of the elements, from phase_ramp
+    # @param levels Phases of the boundaries, in [0, 1)
+    def near_boundary(self, phase, levels):
+        tolerance = self.BOUNDARY_TOLERANCE*(len(phase) + 1)
+        for level in levels:
+            distance = np.abs(phase - level)
+            if level == 0.0:
+                distance = np.minimum(distance, 1.0 - phase)
+            if len(distance) and distance.min() < tolerance:
+                return True
+        return False
+    
+    # Replay the scalar phase accumulator: it is wrapped by 1.0 once it
+    # reaches a threshold, and dp is added to it after each element
+    # @param x         Accumulator at the first element
+    # @param dp        Delta Phase, 0 <= dp < 1
+    # @param n         Number of elements
+    # @param threshold Value the accumulator is wrapped at
+    # @return the accumulator at each element, after any wrap, and a boolean
+    #         array that is True for the elements where it wrapped
+    def accumulated_ramp(self, x, dp, n, threshold):
+        x = float(x)
+        dp = float(dp)
+        if dp*self.ACCUMULATE_RUN > 1.0:
+            value = [0.0]*n
+            wrapped = [False]*n
+            for i in xrange(n):
+                if x >= threshold:
+                    x -= 1.0
+                    wrapped[i] = True
+                value[i] = x
+                x += dp
+            return np.array(value), np.array(wrapped)
+        
+        value = np.empty(n, dtype=np.float64)
+        wrapped = np.zeros(n, dtype=bool)
+        i = 0
+        while i < n:
+            if x >= threshold:
+                x -= 1.0
+                value[i] = x
+                wrapped[i] = True
+                x += dp
+                i += 1
+                continue
+            # The elements up to the next wrap. add.accumulate adds in
+            # sequence, rounding as the scalar loop does.
+            m = n - i
+            if dp > 0.0:
+                m = min(m, int((threshold - x)/dp) + 2)
+            run = value[i:i + m]
+            run[0] = x
+            run[1:] = dp
+            np.add.accumulate(run, out=run)
+            k = int(np.searchsorted(run, threshold))
+            if k < m:
+                # Element i + k wraps, and is written again
+                x = run[k]
+                i += k
+            else:
+                x = run[-1] + dp
+                i += m
+        return value, wrapped
+    
+    # Check the output of the vectorized engine against the scalar engine
+    # @param name Name of the waveform being checked
+    # @param data The vectorized output
+    # @param ref  The scalar output
+    # @param amp  Amplitude the tolerance is relative to
+    def check(self, name, data, ref, amp):
+        ref = np.asarray(ref, dtype=np.float32)
+        if len(data) != len(ref):
+            raise ValueError("%s: vectorized output has %d elements, expected %d" % (name, len(data), len(ref)))
+        if len(ref) == 0:
+            return
+        err = float(np.max(np.abs(data.astype(np.float64) - ref)))
+        if err > self.VERIFY_TOLERANCE * max(abs(float(amp)), 1.0):
+            raise ValueError("%s: vectorized output differs from scalar output by %g" % (name, err))
         
     # Create a white noise array of given magnitude
     # @param fbuf The output array
     # @param sdev Standard deviation
     # @param n    Number of elements
     # @param spa  Scalars per atom, 2 for Complex
+    # @param out  Optional float32 array to write the data to
+    # @param add  Add the noise to the data in out instead of overwriting it
     # @return the new data buffer
-    def whitenoise(self, sdev, n, spa=1):
+    def whitenoise(self, sdev, n, spa=1, out=None, add=False):
+        if add and (self.verify or not self.vectorized or self.seed != int(self.seed)):
+            # Generated apart, then added
+            out += np.asarray(self.whitenoise(sdev, n, spa), dtype=np.float32)
+            return out
+        if add:
+            return self.whitenoise_vector(sdev, n, spa, out, add)
+        if not self.vectorized or self.seed != int(self.seed):
+            return self.scalar_output(self.whitenoise_scalar(sdev, n, spa), out)
+        if self.verify:
+            seed = self.seed
+            ref = self.whitenoise_scalar(sdev, n, spa)
+            self.seed = seed
+        outbuff = self.whitenoise_vector(sdev, n, spa, out)
+        if self.verify:
+            self.check("whitenoise", outbuff, ref, sdev)
+        return outbuff
+    
+    # Jump-ahead tables for the integer generator: for j = 0..LCG_BLOCK-1
+    #   k(i+j+1) = (mult[j]*k(i) + add[j]) mod 2^26
+    # @return the mult and add int64 arrays
+    def lcg_jump_tables(self):
+        if Waveform.lcg_tables is None:
+            A = int(self.A); B = int(self.B)
+            mult = np.empty(self.LCG_BLOCK, dtype=np.int64)
+            add = np.empty(self.LCG_BLOCK, dtype=np.int64)
+            m = 1; a = 0
+            for j in range(self.LCG_BLOCK):
+                m = (m*A) & self.LCG_MASK
+                a = (a*A + B) & self.LCG_MASK
+                mult[j] = m
+                add[j] = a
+            Waveform.lcg_tables = (mult, add)
+        return Waveform.lcg_tables
+    
+    # Jump the integer generator ahead in closed form
+    # @param k     State to start from
+    # @param draws Number of draws
+    # @return the state after them
+    def lcg_jump(self, k, draws):
+        mult = 1; add = 0
+        a = int(self.A); b = int(self.B)
+        while draws:
+            if draws & 1:
+                mult = (a*mult) & self.LCG_MASK
+                add = (a*add + b) & self.LCG_MASK
+            b = (a*b + b) & self.LCG_MASK
+            a = (a*a) & self.LCG_MASK
+            draws >>= 1
+        return (mult*k + add) & self.LCG_MASK
+    
+    # Get the initial seed of a whitenoise stream: the initial seed of
+    # Waveform, moved ahead stream*STREAM_STRIDE draws. Stream 0 is the
+    # initial seed itself.
+    # @param stream Index of the stream
+    def stream_seed(self, stream):
+        if stream == 0:
+            return Waveform.seed
+        # The first draw is done as in the scalar loop, since the seed is
+        # not below 2^26
+        sis = float(Waveform.seed)/self.T26
+        sis = sis*self.A + self.BI
+        sis = sis - float(int(sis))
+        k = int(sis*self.T26)
+        return self.lcg_jump(k, (stream*self.STREAM_STRIDE - 1) & self.LCG_MASK)
+    
+    # Advance the integer generator
+    # @param k     State to start from
+    # @param count Number of draws
+    # @return an int64 array of the count states following k
+    def lcg_states(self, k, count):
+        mult, add = self.lcg_jump_tables()
+        nblocks = (count + self.LCG_BLOCK - 1)//self.LCG_BLOCK
+        starts = np.empty((nblocks, 1), dtype=np.int64)
+        jump_mult = int(mult[-1]); jump_add = int(add[-1])
+        for b in range(nblocks):
+            starts[b] = k
+            k = (jump_mult*k + jump_add) & self.LCG_MASK
+        states = starts*mult
+        states += add
+        states &= self.LCG_MASK
+        return states.ravel()[:count]
+    
+    # Move the whitenoise generator past elements without generating them,
+    # leaving the seed where whitenoise would. The number of draws an
+    # element takes depends on the rejections, so the candidate pairs are
+    # drawn and tested, but no samples computed.
+    # @param n   Number of elements
+    # @param spa Scalars per atom, 2 for Complex
+    def whitenoise_advance(self, n, spa=1):
+        if not self.vectorized or self.seed != int(self.seed):
+            self.whitenoise_scalar(1.0, n, spa)
+            return
+        npairs = (n*spa + 1)//2
+        if npairs == 0:
+            self.seed = int(float(self.seed)/self.T26*self.T26)
+            return
+        
+        sis = float(self.seed)/self.T26
+        sis = sis*self.A + self.BI
+        sis = sis - float(int(sis))
+        k = int(sis*self.T26)
+        
+        i = 0
+        first = True
+        while i < npairs:
+            ncand = min(int((npairs - i)*1.3) + 16, self.LCG_BLOCK*256)
+            if first:
+                states = np.empty(2*ncand, dtype=np.int64)
+                states[0] = k
+                states[1:] = self.lcg_states(k, 2*ncand - 1)
+                first = False
+            else:
+                states = self.lcg_states(k, 2*ncand)
+            v = (states - (1 << 25)).astype(np.float64)
+            v *= 1.0/(1 << 25)
+            sum1 = v[0::2]**2 + v[1::2]**2
+            accepted = np.flatnonzero((sum1 < 1.0) & (sum1 >= 1e-20))
+            if i + len(accepted) < npairs:
+                i += len(accepted)
+                k = int(states[-1])
+            else:
+                k = int(states[2*accepted[npairs - i - 1] + 1])
+                i = npairs
+        
+        self.seed = k
+    
+    # Vectorized white noise. Candidate pairs are drawn in batches and the
+    # polar rejection test is applied as a mask, giving the same samples and
+    # final seed as the scalar loop.
+    # @return a contiguous float32 ndarray
+    def whitenoise_vector(self, sdev, n, spa, out=None, add=False):
+        maxIndex = n*spa
+        npairs = (maxIndex + 1)//2
+        outbuff = self.output(out, maxIndex)
+        fdev = float(sdev)
+        factor = -2.0 / math.log(10.0)
+        if npairs == 0:
+            self.seed = int(float(self.seed)/self.T26*self.T26)
+            return outbuff
+        
+        # The first draw is done as in the scalar loop, since the seed may
+        # not be below 2^26
+        sis = float(self.seed)/self.T26
+        sis = sis*self.A + self.BI
+        sis = sis - float(int(sis))
+        k = int(sis*self.T26)
+        
+        i = 0
+        first = True
+        while i < npairs:
+            # About pi/4 of the candidate pairs are accepted
+            ncand = int((npairs - i)*1.3) + 16
+            if first:
+                states = np.empty(2*ncand, dtype=np.int64)
+                states[0] = k
+                states[1:] = self.lcg_states(k, 2*ncand - 1)
+                first = False
+            else:
+                states = self.lcg_states(k, 2*ncand)
+            v = (states - (1 << 25)).astype(np.float64)
+            v *= 1.0/(1 << 25)
+            v1 = v[0::2]
+            v2 = v[1::2]
+            sum1 = v1*v1 + v2*v2
+            accepted = np.flatnonzero((sum1 < 1.0) & (sum1 >= 1e-20))[:npairs - i]
+            if len(accepted) == 0:
+                k = int(states[-1])
+                continue
+            sum1 = sum1[accepted]
+            sum1 = fdev * np.sqrt(factor*np.log(sum1)/sum1)
+            count = len(accepted)
+            first_values = outbuff[2*i:2*(i+count):2]
+            # The second value of the last pair is dropped for an odd length
+            second = outbuff[2*i+1:2*(i+count):2]
+            if add:
+                first_values += v1[accepted]*sum1
+                second += (v2[accepted]*sum1)[:len(second)]
+            else:
+                first_values[:] = v1[accepted]*sum1
+                second[:] = (v2[accepted]*sum1)[:len(second)]
+            i += count
+            if i < npairs:
+                k = int(states[-1])
+            else:
+                k = int(states[2*accepted[-1] + 1])
+        
+        self.seed = k
+        
+        return outbuff
+    
+    # Scalar white noise
+    def whitenoise_scalar(self, sdev, n, spa=1):
         outbuff = range(n*spa)
         v1 = 0.0; v2 = 0.0; sum1 = 0.0
         fdev = float(sdev)
@@ -97,12 +483,42 @@ class Waveform:
     # @param dp   Delta Phase
     # @param n    Number of elements
     # @param spa  Scalars per atom, 2 for Complex
+    # @param out  Optional float32 array to write the data to
     # @return the new data buffer
    
+    def sincos(self, amp, p, dp, n, spa, out=None):
+        if not self.vectorized or spa not in (1, 2, -1, -2):
+            return self.scalar_output(self.sincos_scalar(amp, p, dp, n, spa), out)
+        outbuff = self.sincos_vector(amp, p, dp, n, spa, out)
+        if self.verify:
+            self.check("sincos", outbuff, self.sincos_scalar(amp, p, dp, n, spa), amp)
+        return outbuff
+    
+    # Vectorized SIN or COSINE, evaluated directly from the phase of each
+    # element. spa 1 and -1 (and 2 and -2) produce the same output.
+    # @return a contiguous float32 ndarray
+    def sincos_vector(self, amp, p, dp, n, spa, out=None):
+        outbuff = self.output(out, n*abs(spa))
+        phase = self.phase_ramp(p, dp, n)
+        phase *= self.TWOPI
+        if abs(spa) == 2:
+            value = np.cos(phase)
+            value *= amp
+            outbuff[0::2] = value
+            np.sin(phase, out=value)
+            value *= amp
+            outbuff[1::2] = value
+        else:
+            np.sin(phase, out=phase)
+            phase *= amp
+            outbuff[:] = phase
+        return outbuff
+    
+    # Scalar SIN or COSINE
     # fast algorithm based on:  sin(x+dp) = sin(x)*cos(dp) + cos(x)*sin(dp)
     #                           cos(x+dp) = cos(x)*cos(dp) - sin(x)*sin(dp)
-    def sincos(self, amp, p, dp, n, spa):
-        outbuff = range(n*spa)
+    def sincos_scalar(self, amp, p, dp, n, spa):
+        outbuff = range(n*abs(spa))
         cxr = amp*math.cos(p*self.TWOPI)
         cxi = amp*math.sin(p*self.TWOPI)
         dxr = math.cos(dp*self.TWOPI)
@@ -141,8 +557,29 @@ class Waveform:
     # @param dp   Delta Phase
     # @param n    Number of elements
     # @param spa  Scalars per atom, 2 for Complex
+    # @param out  Optional float32 array to write the data to
     # @return the new data buffer
-    def square(self, amp, p, dp, n, spa):
+    def square(self, amp, p, dp, n, spa, out=None):
+        if not self.vectorizable(p, dp, spa):
+            return self.scalar_output(self.square_scalar(amp, p, dp, n, spa), out)
+        outbuff = self.square_vector(amp, p, dp, n, spa, out)
+        if self.verify:
+            self.check("square", outbuff, self.square_scalar(amp, p, dp, n, spa), amp)
+        return outbuff
+    
+    # Vectorized SQUARE, derived from a single phase ramp; as in the scalar
+    # code the value is low on the element where the phase wraps
+    # @return a contiguous float32 ndarray
+    def square_vector(self, amp, p, dp, n, spa, out=None):
+        phase, wrapped = self.wrapped_ramp(p, dp, n)
+        if self.near_boundary(phase, (0.0, 0.5)):
+            phase, wrapped = self.accumulated_ramp(p, dp, n, 1.0)
+        famp = float(amp)
+        value = np.where(~wrapped & (phase >= 0.5), famp, -famp)
+        return self.to_float32(value, spa, out)
+    
+    # Scalar SQUARE
+    def square_scalar(self, amp, p, dp, n, spa):
         outbuff = range(n*spa)
         value = 0.0
         famp = float(amp)
@@ -168,8 +605,29 @@ class Waveform:
     # @param dp   Delta Phase
     # @param n    Number of elements
     # @param spa  Scalars per atom, 2 for Complex
+    # @param out  Optional float32 array to write the data to
     # @return the new data buffer
-    def triangle(self, amp, p, dp, n, spa):
+    def triangle(self, amp, p, dp, n, spa, out=None):
+        if not self.vectorizable(p, dp, spa):
+            return self.scalar_output(self.triangle_scalar(amp, p, dp, n, spa), out)
+        outbuff = self.triangle_vector(amp, p, dp, n, spa, out)
+        if self.verify:
+            self.check("triangle", outbuff, self.triangle_scalar(amp, p, dp, n, spa), amp)
+        return outbuff
+    
+    # Vectorized TRIANGLE, derived from a single phase ramp; as in the scalar
+    # code the phase is wrapped to [-0.5, 0.5) before use
+    # @return a contiguous float32 ndarray
+    def triangle_vector(self, amp, p, dp, n, spa, out=None):
+        fp = self.phase_ramp(p, dp, n)
+        fp -= 0.5
+        famp = float(amp)
+        famp2 = 4*famp
+        value = famp - np.abs(fp)*famp2
+        return self.to_float32(value, spa, out)
+    
+    # Scalar TRIANGLE
+    def triangle_scalar(self, amp, p, dp, n, spa):
         outbuff = range(n*spa)
         value = 0.0
         famp = float(amp)
@@ -197,8 +655,30 @@ class Waveform:
     # @param dp   Delta Phase
     # @param n    Number of elements
     # @param spa  Scalars per atom, 2 for Complex
+    # @param out  Optional float32 array to write the data to
     # @return the new data buffer
-    def sawtooth(self, amp, p, dp, n, spa):
+    def sawtooth(self, amp, p, dp, n, spa, out=None):
+        if not self.vectorizable(p, dp, spa):
+            return self.scalar_output(self.sawtooth_scalar(amp, p, dp, n, spa), out)
+        outbuff = self.sawtooth_vector(amp, p, dp, n, spa, out)
+        if self.verify:
+            self.check("sawtooth", outbuff, self.sawtooth_scalar(amp, p, dp, n, spa), amp)
+        return outbuff
+    
+    # Vectorized SAWTOOTH, derived from a single phase ramp; as in the scalar
+    # code the phase is wrapped to [-0.5, 0.5) before use
+    # @return a contiguous float32 ndarray
+    def sawtooth_vector(self, amp, p, dp, n, spa, out=None):
+        fp = self.phase_ramp(p, dp, n)
+        if self.near_boundary(fp, (0.0,)):
+            fp, wrapped = self.accumulated_ramp(float(p) - 0.5, dp, n, 0.5)
+        else:
+            fp -= 0.5
+        famp2 = 2*float(amp)
+        return self.to_float32(fp*famp2, spa, out)
+    
+    # Scalar SAWTOOTH
+    def sawtooth_scalar(self, amp, p, dp, n, spa):
         outbuff = range(n*spa)
         value = 0.0
         famp = float(amp)
@@ -223,8 +703,29 @@ class Waveform:
     # @param dp   Delta Phase
     # @param n    Number of elements
     # @param spa  Scalars per atom, 2 for Complex
+    # @param out  Optional float32 array to write the data to
     # @return the new data buffer
-    def pulse(self, amp, p, dp, n, spa):
+    def pulse(self, amp, p, dp, n, spa, out=None):
+        if not self.vectorizable(p, dp, spa):
+            return self.scalar_output(self.pulse_scalar(amp, p, dp, n, spa), out)
+        outbuff = self.pulse_vector(amp, p, dp, n, spa, out)
+        if self.verify:
+            self.check("pulse", outbuff, self.pulse_scalar(amp, p, dp, n, spa), amp)
+        return outbuff
+    
+    # Vectorized PULSE, derived from a single phase ramp; as in the scalar
+    # code the pulse is on the element where the phase wraps
+    # @return a contiguous float32 ndarray
+    def pulse_vector(self, amp, p, dp, n, spa, out=None):
+        phase, wrapped = self.wrapped_ramp(p, dp, n)
+        if self.near_boundary(phase, (0.0,)):
+            phase, wrapped = self.accumulated_ramp(p, dp, n, 1.0)
+        famp = float(amp)
+        value = np.where(wrapped, famp, 0.0)
+        return self.to_float32(value, spa, out)
+    
+    # Scalar PULSE
+    def pulse_scalar(self, amp, p, dp, n, spa):
         outbuff = range(n*spa)
         value = 0.0
         famp = float(amp)
@@ -247,8 +748,17 @@ class Waveform:
     # @param amp  Amplitude
     # @param n    Number of elements
     # @param spa  Scalars per atom, 2 for Complex
+    # @param out  Optional float32 array to write the data to
     # @return the new data buffer
-    def constant(self, amp, n, spa):
+    def constant(self, amp, n, spa, out=None):
+        if self.vectorized:
+            outbuff = self.output(out, n*spa)
+            outbuff.fill(amp)
+            return outbuff
+        return self.scalar_output(self.constant_scalar(amp, n, spa), out)
+    
+    # Scalar CONSTANT
+    def constant_scalar(self, amp, n, spa):
         outbuff = range(n*spa)
         
         for i in range(n*spa):
@@ -262,8 +772,162 @@ class Waveform:
     # @param n    Number of elements
     # @param spa  Scalars per atom, 2 for Complex
     # @param lrs  LRS seed from previous call
-    # @return the new data buffer and the LRS at end of array
-    def lrs(self, amp, n, spa, lrs):
+    # @param out  Optional float32 array to write the data to
+    # @return the new data buffer; the LRS at end of array is kept in lrs_seed
+    def lrs(self, amp, n, spa, lrs, out=None):
+        if not self.vectorized or spa not in (1, 2):
+            return self.scalar_output(self.lrs_scalar(amp, n, spa, lrs), out)
+        outbuff = self.lrs_vector(amp, n, spa, lrs, out)
+        if self.verify:
+            lrs_seed = self.lrs_seed
+            self.check("lrs", outbuff, self.lrs_scalar(amp, n, spa, lrs), amp)
+            self.lrs_seed = lrs_seed
+        return outbuff
+    
+    # Advance the LRS register one element
+    def lrs_step(self, lrs):
+        bit0 = (~(lrs ^ (lrs>>1) ^ (lrs>>5) ^ (lrs>>25)))&0x1
+        return ((lrs << 1) | bit0) & self.LRS_MASK
+    
+    # Transition tables for j = 1..LRS_BLOCK steps of 32 elements each.
+    # Over 32 elements the register is an affine function of its bytes:
+    #   lrs(i+32*j) = T[j-1,0,byte0] ^ T[j-1,1,byte1] ^ T[j-1,2,byte2] ^
+    #                 T[j-1,3,byte3] ^ C[j-1]
+    # @return the T and C uint32 arrays
+    def lrs_jump_tables(self):
+        if Waveform.lrs_tables is None:
+            def jump(lrs):
+                for i in range(32):
+                    lrs = self.lrs_step(lrs)
+                return lrs
+            const = jump(0)
+            # Image of each register bit under the linear part of one jump
+            columns = [jump(1 << bit) ^ const for bit in range(32)]
+            def linear(word):
+                out = 0
+                for bit in range(32):
+                    if (word >> bit) & 1:
+                        out ^= columns[bit]
+                return out
+            
+            images = np.empty((self.LRS_BLOCK, 32), dtype=np.uint32)
+            consts = np.empty(self.LRS_BLOCK, dtype=np.uint32)
+            image = [1 << bit for bit in range(32)]
+            c = 0
+            for j in range(self.LRS_BLOCK):
+                image = [linear(word) for word in image]
+                c = linear(c) ^ const
+                images[j] = image
+                consts[j] = c
+            
+            values = np.arange(256, dtype=np.uint32)
+            tables = np.zeros((self.LRS_BLOCK, 4, 256), dtype=np.uint32)
+            for bit in range(32):
+                hit = ((values >> (bit % 8)) & 1).astype(bool)
+                tables[:, bit//8, hit] ^= images[:, bit, np.newaxis]
+            Waveform.lrs_tables = (tables, consts)
+        return Waveform.lrs_tables
+    
+    # Compute successive LRS registers
+    # @param lrs   Register to start from
+    # @param count Number of registers
+    # @return a uint32 array of count registers starting with lrs
+    def lrs_states(self, lrs, count):
+        tables, consts = self.lrs_jump_tables()
+        nwords = count//32 + 2
+        nblocks = (nwords + self.LRS_BLOCK - 1)//self.LRS_BLOCK
+        
+        # Register at the start of each block of LRS_BLOCK words
+        starts = np.empty(nblocks, dtype=np.uint32)
+        last = tables[-1]
+        word = lrs & self.LRS_MASK
+        for b in range(nblocks):
+            starts[b] = word
+            word = int(last[0, word & 0xff] ^ last[1, (word >> 8) & 0xff] ^
+                       last[2, (word >> 16) & 0xff] ^ last[3, word >> 24] ^ consts[-1])
+        
+        # Register every 32 elements
+        words = np.empty((nblocks, self.LRS_BLOCK + 1), dtype=np.uint32)
+        words[:, 0] = starts
+        words[:, 1:] = consts
+        for b in range(4):
+            byte = (starts >> (8*b)) & 0xff
+            words[:, 1:] ^= tables[:, b, :].T[byte]
+        words = words[:, :-1].ravel()[:nwords].astype(np.uint64)
+        
+        # Register at each element, shifting in the bits of the next word
+        shift = np.arange(32, dtype=np.uint64)
+        states = (words[:-1, np.newaxis] << shift) | (words[1:, np.newaxis] >> (np.uint64(32) - shift))
+        states &= np.uint64(self.LRS_MASK)
+        states = states.astype(np.uint32).ravel()[:count]
+        
+        # The scalar code maps 0x7fffffff to -1, after which the register
+        # stays at all ones
+        locked = np.flatnonzero(states[1:] == 0x7fffffff)
+        if len(locked):
+            states[locked[0]+1:] = self.LRS_MASK
+        return states
+    
+    # Affine maps of the register over 2**k elements, k = 0..63, each as
+    # the image of every register bit under its linear part and a constant
+    # @return a list of (images, constant) pairs
+    def lrs_power_maps(self):
+        if Waveform.lrs_powers is None:
+            def apply(images, word):
+                out = 0
+                for bit in range(32):
+                    if (word >> bit) & 1:
+                        out ^= images[bit]
+                return out
+            const = self.lrs_step(0)
+            images = [self.lrs_step(1 << bit) ^ const for bit in range(32)]
+            powers = []
+            for k in range(64):
+                powers.append((images, const))
+                # Twice the elements is the map applied to itself
+                const = apply(images, const) ^ const
+                images = [apply(images, word) for word in images]
+            Waveform.lrs_powers = powers
+        return Waveform.lrs_powers
+    
+    # Get the LRS register n elements after lrs, without generating them,
+    # as lrs leaves it in lrs_seed
+    # @param lrs LRS register
+    # @param n   Number of elements
+    # @return the register, as a signed 32 bit value
+    def lrs_advance(self, lrs, n):
+        if n <= 0:
+            return lrs
+        word = lrs & self.LRS_MASK
+        for images, const in self.lrs_power_maps():
+            if n & 1:
+                out = const
+                for bit in range(32):
+                    if (word >> bit) & 1:
+                        out ^= images[bit]
+                word = out
+            n >>= 1
+            if n == 0:
+                break
+        # The scalar code maps 0x7fffffff to -1; the register shifted on
+        # from either is all ones, so only a register ending on it differs
+        if word == 0x7fffffff:
+            word = self.LRS_MASK
+        return word - (1 << 32) if word >= (1 << 31) else word
+    
+    # Vectorized LRS
+    # @return a contiguous float32 ndarray
+    def lrs_vector(self, amp, n, spa, lrs, out=None):
+        factor = (amp/2.0/self.B1G)
+        states = self.lrs_states(lrs, n+1)
+        value = states.view(np.int32).astype(np.float64)
+        value[0] = lrs
+        self.lrs_seed = int(value[n])
+        value *= factor
+        return self.to_float32(value[:n], spa, out)
+    
+    # Scalar LRS
+    def lrs_scalar(self, amp, n, spa, lrs):
         outbuff = range(n*spa)
         factor = (amp/2.0/self.B1G)
         
@@ -282,6 +946,7 @@ class Waveform:
                 lrs &= 0x7fffffff
                 lrs -= 2**31
                 
+        self.lrs_seed = lrs
         return outbuff
     
     # Create an RAMP array of given magnitude
@@ -290,8 +955,47 @@ class Waveform:
     # @param n    Number of elements
     # @param spa  Scalars per atom, 2 for Complex
     # @param data RAMP seed from previous call
+    # @param out  Optional float32 array to write the data to
     # @return the new data buffer and the RAMP value at end of array
-    def ramp(self, amp, n, spa, data):
+    def ramp(self, amp, n, spa, data, out=None):
+        if not self.vectorized or spa not in (1, 2):
+            outbuff, data = self.ramp_scalar(amp, n, spa, data)
+            return self.scalar_output(outbuff, out), data
+        outbuff, end = self.ramp_vector(amp, n, spa, data, out)
+        if self.verify:
+            ref, ref_end = self.ramp_scalar(amp, n, spa, data)
+            self.check("ramp", outbuff, ref, amp)
+            if end != ref_end:
+                raise ValueError("ramp: vectorized end value %s differs from scalar end value %s" % (end, ref_end))
+        return outbuff, end
+    
+    # Vectorized RAMP. The value counts up by one from data until it reaches
+    # amp, then restarts from int(-amp): a first run of r0 elements followed
+    # by runs of k elements.
+    # @return a contiguous float32 ndarray and the RAMP value at end of array
+    def ramp_vector(self, amp, n, spa, data, out=None):
+        low = int(-amp)
+        r0 = max(1, int(math.ceil(amp - data)))
+        k = max(1, int(math.ceil(amp - low)))
+        value = np.arange(n, dtype=np.float64)
+        if n > r0:
+            value[r0:] -= r0
+            np.remainder(value[r0:], k, out=value[r0:])
+            value[r0:] += low
+        value[:r0] += data
+        return self.to_float32(value, spa, out), self.ramp_advance(amp, n, data)
+    
+    # Get the RAMP value n elements after data, without generating them
+    def ramp_advance(self, amp, n, data):
+        low = int(-amp)
+        r0 = max(1, int(math.ceil(amp - data)))
+        k = max(1, int(math.ceil(amp - low)))
+        if n < r0:
+            return data + n
+        return low + (n - r0) % k
+    
+    # Scalar RAMP
+    def ramp_scalar(self, amp, n, spa, data):
         outbuff = range(n*spa)
         for i in range(0, n*spa, spa):
             outbuff[i] = float(np.float32(data))
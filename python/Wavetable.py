@@ -0,0 +1,152 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+'''
+WavetableCache serves packets of periodic waveforms from precomputed tables.
+
+When frequency/sample_rate is a fraction p/q with a small denominator, the
+waveform repeats every q elements, and each packet is a window over one
+period starting at the running phase. The table holds the period tiled to
+q + xfer_len - 1 elements, so every packet is a slice (a view) of it.
+Tables are kept in least recently used order within a memory budget.
+'''
+import collections
+import fractions
+import math
+import numpy as np
+
+class WavetableCache:
+    # Longest period, in elements, that is cached
+    MAX_PERIOD = 65536
+
+    # Memory budget for all tables, in bytes
+    MAX_BYTES = 16*1024*1024
+
+    # Tolerance, in elements, used to decide that a phase is on the grid of
+    # a table
+    TOLERANCE = 1e-6
+
+    # Shapes whose value depends only on the phase of the element. Pulse
+    # (and square, when dp > 0.5) also depends on where the phase wraps.
+    SHAPES = {"sine": "sincos",
+              "square": "square",
+              "triangle": "triangle",
+              "sawtooth": "sawtooth"}
+
+    # Shapes that jump where the phase crosses a boundary. The rounding of
+    # the scalar accumulator decides on which side an element on a boundary
+    # falls, so that they do not repeat exactly, unless dp is a power of two
+    # fraction and the phase is on the grid: then the accumulator is exact.
+    BOUNDARY_SHAPES = ("square", "sawtooth")
+
+    # @param waveform   The Waveform used to compute the tables
+    # @param max_bytes  Memory budget for all tables, in bytes
+    # @param max_period Longest period, in elements, that is cached
+    def __init__(self, waveform, max_bytes=MAX_BYTES, max_period=MAX_PERIOD):
+        self._waveform = waveform
+        self.max_bytes = max_bytes
+        self.max_period = max_period
+        self.nbytes = 0
+        self._tables = collections.OrderedDict()
+
+    # Drop all tables
+    def clear(self):
+        self._tables.clear()
+        self.nbytes = 0
+
+    # Find the period of a waveform
+    # @param dp Delta Phase
+    # @return the number of cycles and elements in one period, or None if
+    #         the period is too long to cache
+    def period(self, dp):
+        frac = fractions.Fraction(dp).limit_denominator(self.max_period)
+        if abs(float(frac) - dp) > 1e-15*abs(dp):
+            return None
+        return frac.numerator, frac.denominator
+
+    # Get a packet from the table of a periodic waveform
+    # @param shape       Name of the shape
+    # @param amp         Amplitude
+    # @param frequency   Frequency, part of the table key
+    # @param sample_rate Sample rate, part of the table key
+    # @param p           Phase
+    # @param dp          Delta Phase
+    # @param n           Number of elements
+    # @param spa         Scalars per atom, 2 for Complex
+    # @return a read-only float32 view of the packet and the phase after
+    #         it, or (None, None) if the waveform can not be served from a
+    #         table
+    def lookup(self, shape, amp, frequency, sample_rate, p, dp, n, spa=1):
+        if shape not in self.SHAPES or (shape == "square" and not 0.0 <= dp <= 0.5):
+            return None, None
+        period = self.period(dp)
+        if period is None:
+            return None, None
+        cycles, q = period
+
+        # Position of the phase on the grid of 1/q cycles
+        x = float(p)*q
+        m = int(math.floor(x))
+        r = x - m
+        if shape in self.BOUNDARY_SHAPES and (q & (q - 1) or r != 0.0):
+            return None, None
+        if r > 1.0 - self.TOLERANCE:
+            m += 1
+            r = 0.0
+        m %= q
+
+        key = (shape, amp, frequency, sample_rate, spa)
+        entry = self._tables.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1].nbytes
+            if abs(entry[0] - r) > self.TOLERANCE or len(entry[1]) < (q + n - 1)*spa:
+                entry = None
+        if entry is None:
+            entry = self._build(shape, amp, r/q, dp, q, cycles, n, spa)
+            if entry is None:
+                return None, None
+        # Most recently used tables are at the end
+        self._tables[key] = entry
+        self.nbytes += entry[1].nbytes
+        self._evict()
+
+        residue, table, index = entry
+        i = index[m]
+        data = table[i*spa:(i+n)*spa]
+        phase = (residue + (m + n*cycles) % q)/q
+        return data, phase
+
+    # Compute a table
+    # @return the residue, table and grid index to table index map, or None
+    #         if the table does not fit in the budget
+    def _build(self, shape, amp, p0, dp, q, cycles, n, spa):
+        length = q + n - 1
+        if length*spa*4 > self.max_bytes:
+            return None
+        one = getattr(self._waveform, self.SHAPES[shape])(amp, p0, dp, q, spa)
+        table = np.resize(np.asarray(one, dtype=np.float32), length*spa)
+        table.flags.writeable = False
+        # Element i of the table is at grid position i*cycles mod q
+        index = np.empty(q, dtype=np.int64)
+        index[(np.arange(q, dtype=np.int64)*cycles) % q] = np.arange(q, dtype=np.int64)
+        return p0*q, table, index
+
+    # Drop least recently used tables until the cache fits in its budget
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._tables:
+            key, entry = self._tables.popitem(last=False)
+            self.nbytes -= entry[1].nbytes
@@ -19,10 +19,12 @@
 import unittest
 import ossie.utils.testing
 import os
-from omniORB import any
+from omniORB import any, CORBA
+from ossie.cf import CF
 import helper_utils as test_utils
 from ossie.properties import props_from_dict
 import time, math
+import tempfile
 import waveforms
 import numpy as np
 from array import array
@@ -171,6 +173,14 @@ class ComponentTests(ossie.utils.testing.ScaComponentTestCase):
         print "\n... Starting Test Constant with dataShort_out"
         self._test_constant(self.shortSink, np.int16)
 
+    def test_constant_reconfigure_float(self):
+        print "\n... Starting Test Constant Reconfigure with dataFloat_out"
+        self._test_constant_reconfigure(self.floatSink, np.float32)
+
+    def test_constant_reconfigure_short(self):
+        print "\n... Starting Test Constant Reconfigure with dataShort_out"
+        self._test_constant_reconfigure(self.shortSink, np.int16)
+
     def test_throttle_float(self):
         print "\n... Starting Throttle Test for dataFloat_out"
         self._test_throttle(self.floatSink)
@@ -218,6 +228,18 @@ class ComponentTests(ossie.utils.testing.ScaComponentTestCase):
     def test_lrs_short(self):
         print "\n... Starting Test lrs with dataShort_out"
         self._test_lrs(self.shortSink, self._convert_float_2_short)
+        
+    def test_prefetch_lrs_float(self):
+        print "\n... Starting Test lrs with prefetch for dataFloat_out"
+        self._test_lrs(self.floatSink, self._convert_float_2_float32, prefetch_depth=8)
+        
+    def test_prefetch_lrs_short(self):
+        print "\n... Starting Test lrs with prefetch for dataShort_out"
+        self._test_lrs(self.shortSink, self._convert_float_2_short, prefetch_depth=8)
+        
+    def test_workers_lrs_float(self):
+        print "\n... Starting Test lrs with worker processes for dataFloat_out"
+        self._test_lrs(self.floatSink, self._convert_float_2_float32, workers=2)
     
     def test_sine_float(self):
         print "\n... Starting Test sine with dataFloat_out"
@@ -275,6 +297,46 @@ class ComponentTests(ossie.utils.testing.ScaComponentTestCase):
         print "\n...Starting Test frequency for dataShort_out"
         self._test_frequency(self.shortSink)
         
+    def test_nco_sine_float(self):
+        print "\n...Starting Test nco sine for dataFloat_out"
+        self._test_nco(self.floatSink)
+
+    def test_complex_float(self):
+        print "\n...Starting Test complex output for dataFloat_out"
+        self._test_complex(self.floatSink, self._convert_float_2_float32)
+
+    def test_complex_short(self):
+        print "\n...Starting Test complex output for dataShort_out"
+        self._test_complex(self.shortSink, self._convert_float_2_short)
+
+    def test_chirp_float(self):
+        print "\n...Starting Test chirp for dataFloat_out"
+        self._test_chirp(self.floatSink)
+
+    def test_channels_float(self):
+        print "\n...Starting Test channels for dataFloat_out"
+        self._test_channels(self.floatSink)
+
+    def test_multitone_float(self):
+        print "\n...Starting Test multitone for dataFloat_out"
+        self._test_multitone(self.floatSink)
+
+    def test_noise_float(self):
+        print "\n...Starting Test sine plus noise for dataFloat_out"
+        self._test_noise(self.floatSink)
+
+    def test_gaussian_float(self):
+        print "\n...Starting Test gaussian for dataFloat_out"
+        self._test_gaussian(self.floatSink)
+
+    def test_ramp_float(self):
+        print "\n...Starting Test ramp for dataFloat_out"
+        self._test_ramp(self.floatSink)
+
+    def test_file_float(self):
+        print "\n...Starting Test file for dataFloat_out"
+        self._test_file(self.floatSink)
+
     ####################
     # HELPER FUNCTIONS #
     ####################
@@ -287,6 +349,14 @@ class ComponentTests(ossie.utils.testing.ScaComponentTestCase):
         self.config_params["xfer_len"] = 1000
         self.config_params["stream_id"] = "unit_test_stream"
 
+    # Configure a struct sequence property of the python implementation
+    # @param prop_id ID of the property
+    # @param structs Members of each struct, by ID
+    def _configure_structseq(self, prop_id, structs):
+        value = CORBA.Any(CORBA.TypeCode("IDL:omg.org/CORBA/AnySeq:1.0"),
+                          [CORBA.Any(CF._tc_Properties, props_from_dict(s)) for s in structs])
+        self.comp_obj.configure([CF.DataType(prop_id, value)])
+
     def _get_received_data(self, start_time, time_len, sink):
         received_data1 = []
         eos_all = False
@@ -378,6 +448,24 @@ class ComponentTests(ossie.utils.testing.ScaComponentTestCase):
                 #self.assertAlmostEqual(value, expected_value)
                 self.assert_isclose(value, expected_value, PRECISION, NUM_PLACES)
 
+    def _test_constant_reconfigure(self, sink, type_cast):
+        # Repeated packets must follow changes to the magnitude
+        self._generate_config()
+        self.config_params["shape"] = "constant"
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        time.sleep(1.)
+        
+        self.config_params["magnitude"] = 500.
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        time.sleep(1.) # Ensure SigGen is sending out the new value before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        self.assertTrue(len(rx_data) > 0)
+        
+        expected_value = type_cast(self.config_params["magnitude"])
+        for p in rx_data:
+            for value in p.data:
+                self.assert_isclose(value, expected_value, PRECISION, NUM_PLACES)
+
     def _test_throttle(self, sink):
         self._generate_config()
         self.config_params["shape"] = "constant"
@@ -506,9 +594,17 @@ class ComponentTests(ossie.utils.testing.ScaComponentTestCase):
                 next_tfsec -= 1.0
                 next_twsec += 1.0
             
-    def _test_lrs(self, sink, convert_function):
+    def _test_lrs(self, sink, convert_function, prefetch_depth=0, workers=0):
         self._generate_config()
         self.config_params["shape"] = "lrs"
+        if prefetch_depth:
+            if self.impl != "python":
+                self.skipTest("prefetch_depth is only in the python implementation")
+            self.config_params["prefetch_depth"] = prefetch_depth
+        if workers:
+            if self.impl != "python":
+                self.skipTest("workers is only in the python implementation")
+            self.config_params["workers"] = workers
         self.comp_obj.configure(props_from_dict(self.config_params))
         time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
         start_time = time.time()
@@ -518,14 +614,35 @@ class ComponentTests(ossie.utils.testing.ScaComponentTestCase):
         print rx_data[0].T
         print rx_data[-1].T
         
-        expected_values = convert_function(self.waveforms.generate_lrs(self.config_params["magnitude"], self.config_params["xfer_len"]))
-        n_expected = len(expected_values)
+        n_expected = self.config_params["xfer_len"]
+        if self.impl != "python":
+            # The other implementations restart the LRS register at 1 for
+            # every packet
+            expected_values = convert_function(self.waveforms.generate_lrs(self.config_params["magnitude"], n_expected))
+            for p in rx_data:
+                self.assertEqual(len(p.data), n_expected)
+                for rx_val, exp_val in zip(p.data, expected_values):
+                    self.assert_isclose(rx_val, exp_val, PRECISION, NUM_PLACES)
+            return
+        
+        # The LRS register carries over from one packet to the next, so the
+        # packets are consecutive pieces of a single sequence starting at 1
+        max_packets = 50
+        expected_values = convert_function(self.waveforms.generate_lrs(self.config_params["magnitude"], n_expected*max_packets))
+        offset = None
+        for i in xrange(max_packets):
+            window = expected_values[i*n_expected:(i+1)*n_expected]
+            if all(isclose(rx_val, exp_val, 10**(-1*PRECISION), 10**(-1*NUM_PLACES)) for rx_val, exp_val in zip(rx_data[0].data, window)):
+                offset = i*n_expected
+                break
+        self.assertNotEqual(offset, None, "First packet received is not part of the LRS sequence")
         for p in rx_data:
             # Data returned is list of test_utils.BufferedPacket
             self.assertEqual(len(p.data), n_expected)
-            for rx_val, exp_val in zip(p.data, expected_values):
+            for rx_val, exp_val in zip(p.data, expected_values[offset:offset+n_expected]):
                 #self.assertAlmostEqual(rx_val, exp_val, 5)
                 self.assert_isclose(rx_val, exp_val, PRECISION, NUM_PLACES)
+            offset += n_expected
     
     def _test_signal_with_phase(self, shape, sink, signal_function, convert_function):
         self._generate_config()
@@ -549,6 +666,193 @@ class ComponentTests(ossie.utils.testing.ScaComponentTestCase):
                 #self.assertAlmostEqual(rx_val, exp_val, 5)
                 self.assert_isclose(rx_val, exp_val, PRECISION, NUM_PLACES)
 
+    def _test_nco(self, sink):
+        if self.impl != "python":
+            self.skipTest("phase_accumulator is only in the python implementation")
+        self._generate_config()
+        self.config_params["shape"] = "sine"
+        self.config_params["phase_accumulator"] = "nco"
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        self.assertTrue(len(rx_data) > 0)
+        
+        # The interpolated sine table is within a few float32 steps of the
+        # reference at this magnitude
+        delta_phase = self.config_params["frequency"] / self.config_params["sample_rate"]
+        expected_values = self.waveforms.generate_sine(self.config_params["magnitude"], self.config_params["xfer_len"], dp=delta_phase)
+        for p in rx_data:
+            self.assertEqual(len(p.data), len(expected_values))
+            for rx_val, exp_val in zip(p.data, expected_values):
+                self.assertAlmostEqual(rx_val, exp_val, 2)
+
+    def _test_complex(self, sink, convert_function):
+        if self.impl != "python":
+            self.skipTest("complex_output is only in the python implementation")
+        self._generate_config()
+        self.config_params["shape"] = "sine"
+        self.config_params["complex_output"] = True
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        self.assertTrue(len(rx_data) > 0)
+        
+        # Interleaved I and Q of amp*exp(j*2*pi*dp*i)
+        delta_phase = self.config_params["frequency"] / self.config_params["sample_rate"]
+        amp = self.config_params["magnitude"]
+        expected_values = []
+        for i in range(self.config_params["xfer_len"]):
+            expected_values.append(amp*math.cos(2*math.pi*delta_phase*i))
+            expected_values.append(amp*math.sin(2*math.pi*delta_phase*i))
+        expected_values = convert_function(expected_values)
+        for p in rx_data:
+            self.assertEqual(p.sri.mode, 1)
+            self.assertEqual(len(p.data), len(expected_values))
+            for rx_val, exp_val in zip(p.data, expected_values):
+                self.assertAlmostEqual(rx_val, exp_val, delta=1)
+
+    def _test_chirp(self, sink):
+        if self.impl != "python":
+            self.skipTest("the chirp shape is only in the python implementation")
+        self._generate_config()
+        self.config_params["shape"] = "chirp"
+        self.config_params["frequency"] = 100.
+        self.config_params["chirp_rate"] = 2000.
+        self.config_params["chirp_bandwidth"] = 1000.
+        self.config_params["chirp_mode"] = "pingpong"
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        self.assertTrue(len(rx_data) > 0)
+        
+        # The phase is continuous, so no step between two elements, within
+        # or across packets, is larger than the top of the sweep allows
+        data = np.concatenate([np.asarray(p.data) for p in rx_data])
+        top = self.config_params["frequency"] + self.config_params["chirp_bandwidth"]
+        max_step = 2*math.pi*top/self.config_params["sample_rate"]*self.config_params["magnitude"]
+        self.assertTrue(np.max(np.abs(np.diff(data))) <= max_step)
+        self.assertTrue(np.max(np.abs(data)) > 0.99*self.config_params["magnitude"])
+
+    def _test_channels(self, sink):
+        if self.impl != "python":
+            self.skipTest("channels is only in the python implementation")
+        self._generate_config()
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        channels = [{"channels::shape": "sine", "channels::frequency": 2000., "channels::magnitude": 1000.,
+                     "channels::stream_id": "sine_channel"},
+                    {"channels::shape": "constant", "channels::frequency": 0., "channels::magnitude": 500.,
+                     "channels::stream_id": ""}]
+        self._configure_structseq("channels", channels)
+        time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        
+        # Each channel is its own stream, with the time stamps of the others
+        streams = {}
+        for p in rx_data:
+            streams.setdefault(p.streamID, []).append(p)
+        self.assertEqual(sorted(streams.keys()), ["sine_channel", "unit_test_stream_1"])
+        times = dict((k, [(p.T.twsec, p.T.tfsec) for p in v][:5]) for k, v in streams.items())
+        self.assertEqual(times["sine_channel"], times["unit_test_stream_1"])
+        
+        expected = self.waveforms.generate_sine(1000., 1000, dp=0.4)
+        for p in streams["sine_channel"]:
+            for rx_val, exp_val in zip(p.data, expected):
+                self.assertAlmostEqual(rx_val, exp_val, delta=1e-3)
+        for p in streams["unit_test_stream_1"]:
+            self.assertEqual(set(p.data), set([500.]))
+
+    def _test_multitone(self, sink):
+        if self.impl != "python":
+            self.skipTest("the multitone shape is only in the python implementation")
+        self._generate_config()
+        self.config_params["shape"] = "multitone"
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        tones = [{"tones::frequency": 500., "tones::amplitude": 1., "tones::phase": 0.},
+                 {"tones::frequency": 1000., "tones::amplitude": 0.5, "tones::phase": 0.25}]
+        self._configure_structseq("tones", tones)
+        time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        self.assertTrue(len(rx_data) > 0)
+        
+        # Both tones have a whole number of cycles per packet
+        t = np.arange(self.config_params["xfer_len"])/self.config_params["sample_rate"]
+        expected = self.config_params["magnitude"]*(np.sin(2*np.pi*500.*t) + 0.5*np.sin(2*np.pi*(1000.*t + 0.25)))
+        for p in rx_data:
+            self.assertTrue(np.max(np.abs(np.asarray(p.data) - expected)) < 1e-2)
+
+    def _test_noise(self, sink):
+        if self.impl != "python":
+            self.skipTest("add_noise is only in the python implementation")
+        self._generate_config()
+        self.config_params["shape"] = "sine"
+        self.config_params["add_noise"] = True
+        self.config_params["snr"] = 10.
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        self.assertTrue(len(rx_data) > 0)
+        
+        # Each packet is the sine, which repeats, plus noise at the SNR
+        expected = np.asarray(self.waveforms.generate_sine(1000., 1000, dp=0.4))
+        data = np.concatenate([np.asarray(p.data) - expected for p in rx_data])
+        snr = 10*np.log10(np.mean(expected**2)/np.mean(data**2))
+        self.assertAlmostEqual(snr, 10., delta=0.5)
+
+    def _test_gaussian(self, sink):
+        if self.impl != "python":
+            self.skipTest("the gaussian shape is only in the python implementation")
+        self._generate_config()
+        self.config_params["shape"] = "gaussian"
+        self.config_params["noise_seed"] = 42
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        self.assertTrue(len(rx_data) > 0)
+        
+        # The standard deviation is the magnitude
+        data = np.concatenate([np.asarray(p.data) for p in rx_data])
+        self.assertAlmostEqual(np.std(data), self.config_params["magnitude"], delta=0.05*self.config_params["magnitude"])
+        self.assertAlmostEqual(np.mean(data), 0., delta=0.05*self.config_params["magnitude"])
+
+    def _test_ramp(self, sink):
+        if self.impl != "python":
+            self.skipTest("the ramp shape is only in the python implementation")
+        self._generate_config()
+        self.config_params["shape"] = "ramp"
+        self.config_params["magnitude"] = 50.
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        self.assertTrue(len(rx_data) > 0)
+        
+        # The ramp counts up by one from -50 to 49, within and across packets
+        data = np.concatenate([np.asarray(p.data) for p in rx_data])
+        steps = np.diff(data)
+        self.assertTrue(np.all((steps == 1) | (steps == -99)))
+        self.assertEqual((np.min(data), np.max(data)), (-50., 49.))
+
+    def _test_file(self, sink):
+        if self.impl != "python":
+            self.skipTest("the file shape is only in the python implementation")
+        recording = tempfile.NamedTemporaryFile(suffix=".raw")
+        np.arange(2500, dtype=np.float32).tofile(recording.name)
+        self._generate_config()
+        self.config_params["shape"] = "file"
+        self.config_params["file_path"] = recording.name
+        self.config_params["file_scaled"] = True
+        self.config_params["magnitude"] = 2.
+        self.comp_obj.configure(props_from_dict(self.config_params))
+        time.sleep(1.) # Ensure SigGen is sending out the desired signal before continuing
+        rx_data = self._get_received_data(time.time(), 1., sink)
+        recording.close()
+        self.assertTrue(len(rx_data) > 0)
+        
+        # The file plays in a loop, scaled by the magnitude
+        data = np.concatenate([np.asarray(p.data) for p in rx_data])
+        steps = np.diff(data)
+        self.assertTrue(np.all((steps == 2) | (steps == -4998)))
+        self.assertEqual((np.min(data), np.max(data)), (0., 4998.))
+
     def _test_push_sri(self, sink):
         self._generate_config()
         self.config_params.pop("stream_id")
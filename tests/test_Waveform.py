@@ -0,0 +1,965 @@
+#!/usr/bin/env python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file distributed with this 
+# source distribution.
+# 
+# This file is part of REDHAWK Basic Components SigGen.
+# 
+# REDHAWK Basic Components SigGen is free software: you can redistribute it and/or modify it under the terms of 
+# the GNU Lesser General Public License as published by the Free Software Foundation, either 
+# version 3 of the License, or (at your option) any later version.
+# 
+# REDHAWK Basic Components SigGen is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; 
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR 
+# PURPOSE.  See the GNU Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License along with this 
+# program.  If not, see http://www.gnu.org/licenses/.
+#
+# Tests for the Waveform engine of the python implementation. These do not
+# need a running domain and compare the vectorized engine against the scalar
+# engine and the reference waveforms used by test_SigGen.py.
+import unittest
+import os, sys
+import pickle
+import StringIO
+import shutil
+import struct
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+import Waveform
+import Wavetable
+import Nco
+import Chirp
+import Noise
+import Shapes
+import Plan
+import Properties
+import Parallel
+import Playback
+import Throttle
+import SampleClock
+import Stream
+import Generate
+import Packet
+import waveforms
+
+class WaveformTests(unittest.TestCase):
+
+    def setUp(self):
+        self.vector = Waveform.Waveform(vectorized=True)
+        self.scalar = Waveform.Waveform(vectorized=False)
+        self.waveforms = waveforms.Waveforms()
+
+    def assert_close(self, data, expected, amp):
+        self.assertEqual(len(data), len(expected))
+        err = np.max(np.abs(np.asarray(data, dtype=np.float64) - np.asarray(expected, dtype=np.float32)))
+        self.assertTrue(err <= Waveform.Waveform.VERIFY_TOLERANCE*amp, "max error %g" % err)
+
+    def test_sincos(self):
+        for spa in (1, 2, -1, -2):
+            for p, dp in ((0.0, 0.4), (0.3, 0.0123), (0.9, -0.25)):
+                data = self.vector.sincos(1000., p, dp, 4096, spa)
+                self.assertEqual(data.dtype, np.float32)
+                self.assertTrue(data.flags.c_contiguous)
+                self.assert_close(data, self.scalar.sincos(1000., p, dp, 4096, spa), 1000.)
+
+    def test_sincos_reference(self):
+        data = self.vector.sincos(1000., 0, 0.4, 1000, 1)
+        self.assert_close(data, self.waveforms.generate_sine(1000., 1000, dp=0.4), 1000.)
+
+    def test_periodic(self):
+        for name in ("square", "triangle", "sawtooth", "pulse"):
+            for spa in (1, 2):
+                for p, dp in ((0.0, 0.4), (0.3, 0.01234567), (0.75, 0.5), (0.999, 0.9)):
+                    data = getattr(self.vector, name)(1000., p, dp, 4096, spa)
+                    self.assertEqual(data.dtype, np.float32)
+                    self.assert_close(data, getattr(self.scalar, name)(1000., p, dp, 4096, spa), 1000.)
+
+    def test_periodic_boundaries(self):
+        # Where the phase lands on a boundary, the rounding of the scalar
+        # accumulator decides the side, and the vectorized generators follow
+        # it: 1 kHz, 500 Hz and 3 kHz at 10 kHz, 440 Hz at 48 kHz
+        verify = Waveform.Waveform(verify=True)
+        for dp in (0.1, 0.05, 0.3, 440./48000., 0.123, 0.5):
+            for p in (0.0, 0.3, 0.5):
+                for name in ("square", "sawtooth", "pulse"):
+                    for spa in (1, 2):
+                        data = getattr(verify, name)(1000., p, dp, 4000, spa)
+                        expected = getattr(self.scalar, name)(1000., p, dp, 4000, spa)
+                        self.assertTrue(np.array_equal(data, np.asarray(expected, dtype=np.float32)), (name, dp, p))
+        # Summing 0.1 ten times falls short of 1.0
+        self.assertEqual(list(np.flatnonzero(self.vector.pulse(1., 0.0, 0.1, 32, 1))), [11, 21, 31])
+
+    def test_accumulated_ramp(self):
+        # A cycle at a time with NumPy, or in a loop, as the scalar loop
+        for dp in (0.001, 0.1, 0.75):
+            x = 0.25
+            expected = []
+            for i in range(3000):
+                wrapped = x >= 1.0
+                if wrapped:
+                    x -= 1.0
+                expected.append((x, wrapped))
+                x += dp
+            value, wrapped = self.vector.accumulated_ramp(0.25, dp, 3000, 1.0)
+            self.assertEqual(zip(value.tolist(), wrapped.tolist()), expected)
+
+    def test_periodic_reference(self):
+        for name in ("square", "triangle", "sawtooth"):
+            data = getattr(self.vector, name)(1000., 0, 0.4, 1000, 1)
+            expected = getattr(self.waveforms, "generate_" + name)(1000., 1000, dp=0.4)
+            self.assertTrue(np.array_equal(data, np.asarray(expected, dtype=np.float32)), name)
+
+    def test_periodic_fallback(self):
+        # Phases outside [0, 1) are left to the scalar accumulators
+        for name in ("square", "triangle", "sawtooth", "pulse"):
+            data = getattr(self.vector, name)(1000., 0.5, 1.25, 100, 1)
+            self.assertEqual(data, getattr(self.scalar, name)(1000., 0.5, 1.25, 100, 1))
+
+    def test_whitenoise(self):
+        # Same samples and same final seed as the scalar loop, across calls
+        for seed in (123456789, 1, 2**31 - 1):
+            self.vector.setSeed(seed)
+            self.scalar.setSeed(seed)
+            for n, spa in ((1, 1), (1001, 1), (5000, 2), (20000, 1)):
+                data = self.vector.whitenoise(100., n, spa)
+                expected = self.scalar.whitenoise(100., n, spa)
+                self.assertTrue(np.array_equal(data, np.asarray(expected, dtype=np.float32)))
+                self.assertEqual(self.vector.seed, self.scalar.seed)
+
+    def test_whitenoise_add(self):
+        for engine in (self.vector, self.scalar, Waveform.Waveform(verify=True)):
+            engine.setSeed(42)
+            data = np.arange(1001, dtype=np.float32)
+            self.assertTrue(engine.whitenoise(10., 1001, 1, data, True) is data)
+            reference = Waveform.Waveform()
+            reference.setSeed(42)
+            expected = reference.whitenoise(10., 1001, 1)
+            self.assertTrue(np.max(np.abs(data - np.arange(1001) - expected)) < 1e-3)
+
+    def test_whitenoise_advance(self):
+        for seed in (123456789, 1, 42):
+            for n, spa in ((0, 1), (1, 1), (1001, 1), (5000, 2)):
+                self.vector.setSeed(seed)
+                self.vector.whitenoise(100., n, spa)
+                self.scalar.setSeed(seed)
+                self.scalar.whitenoise_advance(n, spa)
+                self.assertEqual(self.vector.seed, self.scalar.seed)
+                self.vector.setSeed(seed)
+                self.vector.whitenoise_advance(n, spa)
+                self.assertEqual(self.vector.seed, self.scalar.seed)
+
+    def test_stream_seed(self):
+        for k in (0, 1, 12345, 2**26 - 1):
+            for draws in (1, 2, 4097, 100000):
+                self.assertEqual(self.vector.lcg_jump(k, draws), self.vector.lcg_states(k, draws)[-1])
+        # Stream s starts where the whitenoise of stream 0 is after
+        # s*STREAM_STRIDE draws
+        self.assertEqual(self.vector.stream_seed(0), 123456789)
+        first = (123456789*int(self.vector.A) + int(self.vector.B)) % 2**26
+        for stream in (1, 2, 1000):
+            expected = self.vector.lcg_jump(first, (stream*self.vector.STREAM_STRIDE - 1) % 2**26)
+            self.assertEqual(self.vector.stream_seed(stream), expected)
+        self.assertEqual(len(set(self.vector.stream_seed(s) for s in range(4096))), 4096)
+
+    def test_lrs(self):
+        for seed in (1, 12345, -5, -1073741825):
+            for n, spa in ((1, 1), (33, 1), (1000, 1), (5000, 2), (70001, 1)):
+                data = self.vector.lrs(1000., n, spa, seed)
+                expected = self.scalar.lrs(1000., n, spa, seed)
+                self.assertTrue(np.array_equal(data, np.asarray(expected, dtype=np.float32)))
+                self.assertEqual(self.vector.lrs_seed, self.scalar.lrs_seed)
+
+    def test_lrs_advance(self):
+        # Including registers that lock at all ones
+        for seed in (1, 12345, -5, -1, 0x7fffffff, 0x3ffffff, 0x7c000000 | 0x3ffffff):
+            for n in (0, 1, 5, 31, 32, 33, 1000, 70001):
+                self.vector.lrs(1000., n, 1, seed)
+                self.assertEqual(self.vector.lrs_advance(seed, n), self.vector.lrs_seed)
+
+    def test_lrs_continuous(self):
+        expected = np.asarray(self.waveforms.generate_lrs(1000., 3000), dtype=np.float32)
+        data = [self.vector.lrs(1000., 1000, 1, self.vector.lrs_seed) for i in range(3)]
+        self.assertTrue(np.array_equal(np.concatenate(data), expected))
+
+    def test_ramp(self):
+        for amp in (0., 2.5, 5., 100.):
+            for start in (0, -5, 3, 20, -200):
+                for n, spa in ((1, 1), (7, 1), (1000, 2)):
+                    data, end = self.vector.ramp(amp, n, spa, start)
+                    expected, expected_end = self.scalar.ramp(amp, n, spa, start)
+                    self.assertTrue(np.array_equal(data, np.asarray(expected, dtype=np.float32)))
+                    self.assertEqual(end, expected_end)
+
+    def test_output_buffer(self):
+        out = np.zeros(1001, dtype=np.float32)
+        for name in ("sincos", "square", "triangle", "sawtooth", "pulse"):
+            data = getattr(self.vector, name)(1000., 0.25, 0.01, 1001, 1, out)
+            self.assertTrue(data is out)
+            self.assertTrue(np.array_equal(out, getattr(self.vector, name)(1000., 0.25, 0.01, 1001, 1)))
+        self.vector.setSeed(42)
+        self.scalar.setSeed(42)
+        self.vector.whitenoise(10., 1001, 1, out)
+        self.assertTrue(np.array_equal(out, np.asarray(self.scalar.whitenoise(10., 1001, 1), dtype=np.float32)))
+        self.assertRaises(ValueError, self.vector.sincos, 1., 0., 0.1, 1000, 1, out)
+
+    def test_verify(self):
+        verify = Waveform.Waveform(verify=True)
+        verify.sincos(100., 0.1, 0.01, 1000, 2)
+        verify.VERIFY_TOLERANCE = -1.0
+        self.assertRaises(ValueError, verify.sincos, 100., 0.1, 0.01, 1000, 2)
+
+class NoiseTests(unittest.TestCase):
+
+    def test_sequence(self):
+        for engine in Noise.Noise.ENGINES:
+            data = Noise.Noise(42, 0, engine).gaussian(1., 1000, 1)
+            self.assertTrue(np.array_equal(data, Noise.Noise(42, 0, engine).gaussian(1., 1000, 1)))
+            self.assertFalse(np.array_equal(data, Noise.Noise(42, 1, engine).gaussian(1., 1000, 1)))
+            self.assertFalse(np.array_equal(data, Noise.Noise(43, 0, engine).gaussian(1., 1000, 1)))
+            # Negative seeds and streams are sequences of their own
+            self.assertFalse(np.array_equal(data, Noise.Noise(-42, 0, engine).gaussian(1., 1000, 1)))
+            data = Noise.Noise(42, 1, engine).gaussian(1., 1000, 1)
+            self.assertFalse(np.array_equal(data, Noise.Noise(42, -1, engine).gaussian(1., 1000, 1)))
+            self.assertTrue(np.array_equal(Noise.Noise(-1, 0, engine).gaussian(1., 1000, 1),
+                                           Noise.Noise(2**64 - 1, 0, engine).gaussian(1., 1000, 1)))
+        self.assertRaises(ValueError, Noise.Noise, 0, 0, "mt19937")
+
+    def test_distributions(self):
+        noise = Noise.Noise(1)
+        data = noise.gaussian(10., 50000, 2)
+        self.assertEqual(data.dtype, np.float32)
+        self.assertTrue(abs(np.std(data) - 10.) < 0.2)
+        data = noise.uniform(10., 50000, 1)
+        self.assertTrue(np.min(data) >= -10. and np.max(data) < 10.)
+        self.assertTrue(abs(np.mean(data)) < 0.2)
+        data = noise.impulsive(10., 0.05, 100000, 1)
+        self.assertTrue(abs(np.mean(data != 0) - 0.05) < 0.005)
+
+    def test_output_buffer(self):
+        noise = Noise.Noise(1)
+        out = np.zeros(2000, dtype=np.float32)
+        for name in ("gaussian", "uniform"):
+            self.assertTrue(getattr(noise, name)(1., 1000, 2, out) is out)
+        self.assertTrue(noise.impulsive(1., 0.5, 1000, 2, out) is out)
+        self.assertRaises(ValueError, noise.gaussian, 1., 1000, 1, out)
+
+class WavetableTests(unittest.TestCase):
+
+    def setUp(self):
+        self.waveform = Waveform.Waveform()
+        self.cache = Wavetable.WavetableCache(self.waveform)
+
+    def _compare(self, shape, method, frequency, sample_rate, p, n, packets):
+        dp = frequency/sample_rate
+        phase = p
+        for i in range(packets):
+            data, next_phase = self.cache.lookup(shape, 1000., frequency, sample_rate, phase, dp, n)
+            self.assertTrue(data is not None)
+            expected = getattr(self.waveform, method)(1000., phase, dp, n, 1)
+            self.assertTrue(np.max(np.abs(data - expected)) <= 1e-3, shape)
+            if shape in Wavetable.WavetableCache.BOUNDARY_SHAPES:
+                self.assertTrue(np.array_equal(data, expected), shape)
+            phase += dp*n
+            phase -= np.floor(phase)
+            self.assertTrue(abs(next_phase - phase) < 1e-9)
+            phase = next_phase
+
+    def test_lookup(self):
+        self._compare("sine", "sincos", 2000., 5000., 0., 1000, 20)
+        self._compare("sine", "sincos", -1000., 48000., 0.123, 999, 20)
+        self._compare("triangle", "triangle", 440., 44100., 0.5, 1024, 20)
+        self._compare("sawtooth", "sawtooth", 3., 8., 0.75, 100, 20)
+        self._compare("square", "square", 1000., 8000., 0., 1000, 20)
+        # SigGen starts from an integer phase
+        self._compare("sine", "sincos", 123.456, 1000., 0, 1000, 5)
+
+    def test_not_cached(self):
+        self.assertEqual(self.cache.lookup("sine", 1., 1234.5678, 5000., 0., 1234.5678/5000., 100), (None, None))
+        self.assertEqual(self.cache.lookup("pulse", 1., 1000., 5000., 0., 0.2, 100), (None, None))
+        # The accumulator of the square and sawtooth does not repeat exactly
+        self.assertEqual(self.cache.lookup("square", 1., 1000., 10000., 0., 0.1, 100), (None, None))
+        self.assertEqual(self.cache.lookup("sawtooth", 1., 1000., 8000., 0.3, 0.125, 100), (None, None))
+        self.assertEqual(self.cache.lookup("whitenoise", 1., 1000., 5000., 0., 0.2, 100), (None, None))
+
+    def test_eviction(self):
+        cache = Wavetable.WavetableCache(self.waveform, max_bytes=100000)
+        for frequency in range(1, 100):
+            cache.lookup("sine", 1., float(frequency), 1000., 0., frequency/1000., 1000)
+            self.assertTrue(cache.nbytes <= 100000)
+        self.assertTrue(("sine", 1., 99., 1000., 1) in cache._tables)
+        self.assertFalse(("sine", 1., 1., 1000., 1) in cache._tables)
+
+class NcoTests(unittest.TestCase):
+
+    def _exact_phase(self, nco, p, dp, n):
+        fw = nco.frequency_word(dp)
+        start = int(round(p*2.0**nco.phase_bits))
+        return np.array([(start + i*fw) % 2**nco.phase_bits for i in range(n)], dtype=np.float64)/2.0**nco.phase_bits
+
+    def test_sincos(self):
+        for bits in (32, 64):
+            nco = Nco.Nco(4096, True, bits)
+            nco.set_phase(0.3)
+            phase = self._exact_phase(nco, 0.3, 0.0123, 5000) * 2*np.pi
+            data = nco.sincos(1000., 0.0123, 5000, 2)
+            self.assertTrue(np.max(np.abs(data[0::2] - 1000.*np.cos(phase))) < 1e-3)
+            self.assertTrue(np.max(np.abs(data[1::2] - 1000.*np.sin(phase))) < 1e-3)
+
+    def test_table(self):
+        # Error of the table lookup falls with the table size and interpolation
+        errors = []
+        for size, interpolate in ((256, False), (4096, False), (256, True), (4096, True)):
+            nco = Nco.Nco(size, interpolate)
+            phase = self._exact_phase(nco, 0., 0.001234, 10000) * 2*np.pi
+            errors.append(np.max(np.abs(nco.sincos(1., 0.001234, 10000, 1) - np.sin(phase))))
+        self.assertTrue(errors[0] > errors[1] > errors[2] > errors[3])
+        self.assertTrue(errors[3] < 1e-6)
+        self.assertEqual(Nco.Nco(1000).table_bits, 10)
+
+    def test_continuous(self):
+        # Packets are the same as one long packet, for any packet length
+        for name in ("sincos", "square", "triangle", "sawtooth", "pulse"):
+            whole = getattr(Nco.Nco(), name)(1., 0.0371, 10000, 1)
+            nco = Nco.Nco()
+            packets = [getattr(nco, name)(1., 0.0371, n, 1) for n in (1, 999, 3000, 6000)]
+            self.assertTrue(np.array_equal(np.concatenate(packets), whole), name)
+
+    def test_periodic(self):
+        # Same as the float accumulators away from the wrap of the phase
+        waveform = Waveform.Waveform()
+        for name in ("square", "triangle", "sawtooth", "pulse"):
+            nco = Nco.Nco()
+            nco.set_phase(0.25)
+            data = getattr(nco, name)(1000., 0.01234567, 4096, 1)
+            expected = getattr(waveform, name)(1000., 0.25, 0.01234567, 4096, 1)
+            self.assertTrue(np.max(np.abs(data - expected)) < 1e-2, name)
+
+    def test_phase(self):
+        nco = Nco.Nco()
+        nco.set_phase(0.75)
+        self.assertEqual(nco.get_phase(), 0.75)
+        nco.sincos(1., 0.25, 7, 1)
+        self.assertEqual(nco.get_phase(), 0.5)
+
+class ChirpTests(unittest.TestCase):
+
+    def _frequency(self, chirp, dp, ddp, length, pingpong, n):
+        # Delta phase between consecutive elements of the complex output
+        data = chirp.chirp(1., dp, ddp, length, pingpong, n, 2).astype(np.float64)
+        z = data[0::2] + 1j*data[1::2]
+        return np.angle(z[1:]/z[:-1])/(2*np.pi)
+
+    def test_repeat(self):
+        # Sweep from 0.01 to 0.11 over 1000 elements, then start over
+        f = self._frequency(Chirp.Chirp(), 0.01, 1e-4, 1000., False, 2500)
+        u = np.arange(2499) % 1000 + 0.5
+        expected = 0.01 + 1e-4*u
+        jumps = np.arange(2499) % 1000 == 999
+        self.assertTrue(np.max(np.abs(f[~jumps] - expected[~jumps])) < 1e-6)
+
+    def test_pingpong(self):
+        f = self._frequency(Chirp.Chirp(), 0.01, 1e-4, 1000., True, 4000)
+        u = np.arange(3999) % 2000 + 0.5
+        expected = 0.01 + 1e-4*np.where(u < 1000, u, 2000 - u)
+        self.assertTrue(np.max(np.abs(f - expected)) < 1e-6)
+
+    def test_continuous(self):
+        for pingpong in (False, True):
+            whole = Chirp.Chirp().chirp(1., 0.02, -3e-5, 777.7, pingpong, 5000, 1)
+            chirp = Chirp.Chirp()
+            packets = [chirp.chirp(1., 0.02, -3e-5, 777.7, pingpong, n, 1) for n in (1, 999, 1500, 2500)]
+            self.assertTrue(np.max(np.abs(np.concatenate(packets) - whole)) < 1e-5)
+
+    def test_phase(self):
+        chirp = Chirp.Chirp()
+        chirp.start(0.25)
+        chirp.chirp(1., 0.01, 1e-4, 100., False, 350, 1)
+        phase = chirp.get_phase(0.01, 1e-4, 100., False)
+        self.assertTrue(abs(chirp.chirp(1., 0.01, 1e-4, 100., False, 1, 1)[0] - np.sin(2*np.pi*phase)) < 1e-6)
+
+class ShapesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.waveform = Waveform.Waveform()
+        self.tables = Wavetable.WavetableCache(self.waveform)
+
+    def _create(self, shape, **kwds):
+        config = dict.fromkeys(Plan.Plan._fields)
+        config.update(shape=shape, magnitude=100., frequency=123.4, sample_rate=10000., xfer_len=100, spa=1,
+                      phase_accumulator="float", tones=(), noise_engine="pcg64", noise_seed=0, noise_stream=0,
+                      impulse_probability=0.1)
+        config["delta_phase"] = config["frequency"]/config["sample_rate"]
+        config.update(kwds)
+        return Shapes.create(Plan.Plan(**config), self.waveform, self.tables)
+
+    def _generate(self, shape, previous=None):
+        shape.take_over(previous)
+        return shape.generate_into(np.empty(100, dtype=np.float32), 100)
+
+    def test_registry(self):
+        for name in ("sine", "square", "triangle", "sawtooth", "pulse", "chirp", "multitone", "constant",
+                     "whitenoise", "gaussian", "uniform", "impulsive", "lrs", "ramp"):
+            shape = self._create(name)
+            self.assertTrue(isinstance(shape, Shapes.SHAPES[name]))
+            self.assertFalse(hasattr(shape, "__dict__"))
+        self.assertEqual(self._create("unknown"), None)
+
+    def test_ramp(self):
+        shape = self._create("ramp", magnitude=5.)
+        data = np.concatenate([self._generate(shape, shape) for i in range(3)])
+        expected, end = self.waveform.ramp_scalar(5., 300, 1, -5)
+        self.assertTrue(np.array_equal(data, np.asarray(expected, dtype=np.float32)))
+
+    def test_multitone(self):
+        tones = ((0.01, 1., 0.25), (-0.123, 0.5, 0.), (0.4, 0.25, 0.5))
+        for spa in (1, 2):
+            shape = self._create("multitone", tones=tones, spa=spa)
+            shape.take_over(None)
+            data = np.concatenate([shape.generate_into(np.empty(n*spa, dtype=np.float32), n)
+                                   for n in (1, 99, 1000)])
+            t = np.arange(1100)
+            phase = 2*np.pi*(np.array([p + dp*t for dp, a, p in tones]))
+            amps = 100.*np.array([a for dp, a, p in tones])
+            if spa == 2:
+                self.assertTrue(np.max(np.abs(data[0::2] - amps.dot(np.cos(phase)))) < 1e-3)
+                self.assertTrue(np.max(np.abs(data[1::2] - amps.dot(np.sin(phase)))) < 1e-3)
+            else:
+                self.assertTrue(np.max(np.abs(data - amps.dot(np.sin(phase)))) < 1e-3)
+
+    def test_multitone_blocks(self):
+        # More phases than one block, and the tones carry over to a new plan
+        tones = tuple((0.001*k, 1., 0.) for k in range(300))
+        shape = self._create("multitone", tones=tones, xfer_len=1000)
+        first = shape.generate_into(np.empty(1000, dtype=np.float32), 1000)
+        second = self._create("multitone", tones=tones, xfer_len=1000)
+        second.take_over(shape)
+        data = np.concatenate([first, second.generate_into(np.empty(1000, dtype=np.float32), 1000)])
+        t = np.arange(2000)
+        expected = np.sin(2*np.pi*np.multiply.outer(np.arange(300)*0.001, t)).sum(axis=0)*100.
+        self.assertTrue(np.max(np.abs(data - expected)) < 1e-2)
+        self.assertTrue(self._create("multitone", tones=((0.25, 1., 0.),)).repeats())
+        self.assertEqual(self._create("multitone").generate_into(np.ones(100, dtype=np.float32), 100).max(), 0.)
+
+    def test_noise(self):
+        shape = self._create("sine", snr=10., xfer_len=20000)
+        self.assertFalse(self._create("whitenoise", snr=10.).noise_deviation())
+        shape.take_over(None)
+        # The packet may be a read-only table
+        data = np.array(shape.generate_into(np.empty(20000, dtype=np.float32), 20000))
+        signal = data.copy()
+        shape.add_noise(data, 20000)
+        snr = 10*np.log10(np.mean(signal.astype(np.float64)**2)/np.mean((data - signal).astype(np.float64)**2))
+        self.assertTrue(abs(snr - 10.) < 0.2)
+        # The noise carries on the sequence of the whitenoise shape
+        noise = self._create("whitenoise", magnitude=shape.noise*Shapes.NOISE_SCALE, xfer_len=100)
+        noise.take_over(shape)
+        expected = Waveform.Waveform().whitenoise(shape.noise*Shapes.NOISE_SCALE, 20100, 1)[20000:]
+        self.assertTrue(np.array_equal(noise.generate_into(np.empty(100, dtype=np.float32), 100), expected))
+        # Each channel adds the noise of its own stream
+        added = []
+        for stream in (0, 1):
+            shape = self._create("constant", snr=0., xfer_len=20000, noise_stream=stream)
+            shape.take_over(None)
+            data = shape.generate_into(np.zeros(20000, dtype=np.float32), 20000).copy()
+            shape.add_noise(data, 20000)
+            added.append(data)
+        self.assertTrue(abs(np.corrcoef(added[0], added[1])[0, 1]) < 0.05)
+
+    def test_random_handoff(self):
+        # The engine carries on across other shapes, and starts over with
+        # another seed
+        gaussian = self._create("gaussian", noise_seed=7)
+        first = np.array(self._generate(gaussian))
+        sine = self._create("sine")
+        self._generate(sine, gaussian)
+        data = self._generate(self._create("gaussian", noise_seed=7), sine)
+        self.assertTrue(np.array_equal(data, Noise.Noise(7).gaussian(100., 200, 1)[100:]))
+        data = self._generate(self._create("uniform", noise_seed=8), sine)
+        self.assertTrue(np.array_equal(data, Noise.Noise(8).uniform(100., 100, 1)))
+
+    def test_advance(self):
+        tones = ((0.01, 1., 0.25), (0.123, 0.5, 0.))
+        for name, kwds in (("sine", {}), ("sine", {"phase_accumulator": "nco"}), ("pulse", {"phase_accumulator": "nco"}),
+                           ("chirp", {"delta_phase_offset": 1e-5, "chirp_length": 500.}), ("multitone", {"tones": tones}),
+                           ("ramp", {}), ("constant", {}), ("lrs", {})):
+            whole = self._create(name, **kwds)
+            shape = self._create(name, **kwds)
+            whole.take_over(None)
+            expected = np.array(whole.generate_into(np.empty(1000, dtype=np.float32), 1000))
+            shape.take_over(None)
+            self.assertTrue(shape.seekable())
+            shape.advance(300)
+            data = shape.generate_into(np.empty(700, dtype=np.float32), 700)
+            self.assertTrue(np.max(np.abs(data - expected[300:])) < 1e-3, name)
+        self.assertFalse(self._create("whitenoise").seekable())
+
+    def test_generate(self):
+        tones = ((0.01, 1., 0.25), (0.123, 0.5, 0.))
+        # Odd packet sizes drop the second value of the last pair of
+        # whitenoise, and impulsive draws a packet of gaussians then a
+        # packet of uniforms, so both depend on where the packets end
+        for xfer_len, spa in ((100, 1), (777, 1), (778, 1), (389, 2)):
+            for name, kwds in (("sine", {"phase_accumulator": "nco"}), ("chirp", {"delta_phase_offset": 1e-5, "chirp_length": 500.}),
+                               ("multitone", {"tones": tones}), ("lrs", {}), ("whitenoise", {}), ("gaussian", {}),
+                               ("impulsive", {}), ("square", {"snr": 10.}), ("sine", {"snr": 0.})):
+                kwds = dict(kwds, xfer_len=xfer_len, spa=spa)
+                size = xfer_len*spa
+                shape = self._create(name, **kwds)
+                previous = self._create("ramp", **kwds)
+                previous.take_over(None)
+                previous.fill(np.empty(size, dtype=np.float32), xfer_len)
+                shape.take_over(previous)
+                expected = np.empty(6*size, dtype=np.float32)
+                for i in range(6):
+                    shape.fill(expected[i*size:(i + 1)*size], xfer_len)
+                self.assertEqual(shape.index, 7*xfer_len)
+                # Any elements since the shape took over, leaving it as it is
+                for start, n in ((0, 6*xfer_len), (2*xfer_len, xfer_len), (xfer_len + 3, 2*xfer_len + 5), (5*xfer_len - 1, 2)):
+                    data = shape.generate(xfer_len + start, n)
+                    self.assertTrue(np.max(np.abs(data - expected[start*spa:(start + n)*spa])) < 1e-3, (name, xfer_len))
+                self.assertEqual(shape.index, 7*xfer_len)
+                self.assertRaises(ValueError, shape.generate, xfer_len - 1, 10)
+                # Back to the start of a packet, and on from it
+                shape.seek(4*xfer_len)
+                data = np.empty(size, dtype=np.float32)
+                shape.fill(data, xfer_len)
+                self.assertTrue(np.max(np.abs(data - expected[3*size:4*size])) < 1e-3, (name, xfer_len))
+                self.assertEqual(shape.index, 5*xfer_len)
+                if not shape.closed_form():
+                    self.assertRaises(ValueError, shape.seek, 4*xfer_len + 1)
+
+    def test_generate_boundaries(self):
+        # The float accumulator wraps on the boundaries at 1 kHz at 10 kHz,
+        # where the rounding of the phase carried from packet to packet
+        # decides the element
+        for name in ("square", "sawtooth", "pulse", "sine"):
+            shape = self._create(name, frequency=1000., delta_phase=0.1, xfer_len=777)
+            shape.take_over(None)
+            expected = np.empty(20*777, dtype=np.float32)
+            for i in range(20):
+                shape.fill(expected[i*777:(i + 1)*777], 777)
+            for start, n in ((6000, 1770), (777*7, 3*777), (14000, 1500)):
+                self.assertTrue(np.array_equal(shape.generate(start, n), expected[start:start + n]), (name, start))
+            shape.seek(777*12)
+            data = np.empty(777, dtype=np.float32)
+            shape.fill(data, 777)
+            self.assertTrue(np.array_equal(data, expected[777*12:777*13]), name)
+
+    def test_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "data.raw")
+            np.arange(250, dtype=np.float32).tofile(path)
+            shape = self._create("file", file_path=path, file_type="float", file_scale=1.0)
+            shape.take_over(None)
+            first = shape.render(np.empty(100, dtype=np.float32), 100)
+            self.assertTrue(np.array_equal(first, np.arange(100)))
+            self.assertFalse(first.flags.writeable)
+            data = np.empty(200, dtype=np.float32)
+            shape.fill(data, 200)
+            self.assertTrue(np.array_equal(data, np.arange(100, 300) % 250))
+            # A new plan of the same file carries on where it was, and is
+            # pickled without the mapping
+            scaled = self._create("file", file_path=path, file_type="float", file_scale=2.0)
+            scaled.take_over(shape)
+            copy = pickle.loads(pickle.dumps(scaled, 2))
+            self.assertEqual(copy.playback, None)
+            copy.attach(self.waveform, self.tables)
+            copy.fill(data[:10], 10)
+            self.assertTrue(np.array_equal(data[:10], 2*np.arange(50, 60)))
+            self.assertTrue(np.array_equal(scaled.generate(550, 10), 2*np.arange(50, 60)))
+            self.assertRaises(ValueError, self._create, "file", file_path=path, file_type="unknown", file_scale=1.0)
+            self.assertRaises(EnvironmentError, self._create, "file", file_path=path + ".missing", file_type="float",
+                              file_scale=1.0)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_pickle(self):
+        shape = self._create("sine", phase_accumulator="nco")
+        self._generate(shape)
+        copy = pickle.loads(pickle.dumps(shape, 2))
+        self.assertEqual(copy.waveform, None)
+        self.assertEqual(copy.nco.get_phase(), shape.nco.get_phase())
+        copy.attach(self.waveform, self.tables)
+        expected = np.array(shape.generate_into(np.empty(100, dtype=np.float32), 100))
+        self.assertTrue(np.array_equal(copy.generate_into(np.empty(100, dtype=np.float32), 100), expected))
+        fresh = self._create("sine", phase_accumulator="nco")
+        fresh.adopt(copy)
+        self.assertTrue(fresh.nco is copy.nco)
+
+    def test_phase_handoff(self):
+        sine = self._create("sine")
+        self._generate(sine)
+        sawtooth = self._create("sawtooth")
+        data = self._generate(sawtooth, sine)
+        expected = self.waveform.sawtooth(100., (123.4/10000.*100) % 1.0, 123.4/10000., 100, 1)
+        self.assertTrue(np.max(np.abs(data - expected)) < 1e-3)
+
+    def test_seed_handoff(self):
+        noise = self._create("whitenoise")
+        first = self._generate(noise)
+        sine = self._create("sine")
+        self._generate(sine, noise)
+        # The seed is handed over, not taken from the engine
+        self.waveform.setSeed(1)
+        data = self._generate(self._create("whitenoise"), sine)
+        expected = Waveform.Waveform().whitenoise(100., 200, 1)[100:]
+        self.assertTrue(np.array_equal(data, expected))
+        self.assertFalse(np.array_equal(data, first))
+
+    def test_whitenoise_channels(self):
+        # Each channel starts a stream of its own, whatever the engine did
+        # before; stream 0 is the sequence of the single channel
+        first = self._create("whitenoise")
+        data = self._generate(first)
+        self.assertTrue(np.array_equal(data, Waveform.Waveform().whitenoise(100., 100, 1)))
+        second = self._create("whitenoise", noise_stream=1)
+        other = np.concatenate([self._generate(second, second) for i in range(100)])
+        data = np.concatenate([data] + [self._generate(first, first) for i in range(99)])
+        self.assertTrue(abs(np.corrcoef(data, other)[0, 1]) < 0.05)
+
+class ParallelTests(unittest.TestCase):
+
+    def setUp(self):
+        self.waveform = Waveform.Waveform()
+        self.tables = Wavetable.WavetableCache(self.waveform)
+        self.parallel = Parallel.ParallelGenerator(2)
+        self.parallel.MIN_RANGE = 100
+
+    def tearDown(self):
+        self.parallel.close()
+
+    def _create(self, shape, **kwds):
+        config = dict.fromkeys(Plan.Plan._fields)
+        config.update(shape=shape, magnitude=100., frequency=123.4, sample_rate=10000., delta_phase=0.01234,
+                      xfer_len=1000, spa=1, phase_accumulator="nco", tones=(), noise_stream=0)
+        config.update(kwds)
+        generator = Shapes.create(Plan.Plan(**config), self.waveform, self.tables)
+        generator.take_over(None)
+        return generator
+
+    def test_generate(self):
+        # Rows split into ranges, and rows generated whole, carry on across
+        # packets as in the component
+        names = ("sine", "lrs", "ramp", "whitenoise")
+        serial = [self._create(name) for name in names]
+        parallel = [self._create(name) for name in names]
+        for i in range(3):
+            data = self.parallel.generate(parallel, 1000, 1000)
+            for row, generator in enumerate(serial):
+                expected = np.empty(1000, dtype=np.float32)
+                generator.fill(expected, 1000)
+                self.assertTrue(np.array_equal(data[row], expected), names[row])
+
+    def test_generate_boundaries(self):
+        # The float accumulator wraps on the boundaries at 1 kHz and 2 kHz
+        # at 10 kHz, where the rounding since the start of the packet
+        # decides the element
+        for dp in (0.1, 0.2):
+            for accumulator in ("float", "nco"):
+                names = ("square", "sawtooth", "pulse")
+                kwds = dict(frequency=dp*10000., delta_phase=dp, phase_accumulator=accumulator)
+                serial = [self._create(name, **kwds) for name in names]
+                parallel = [self._create(name, **kwds) for name in names]
+                for i in range(3):
+                    data = self.parallel.generate(parallel, 1000, 1000)
+                    for row, generator in enumerate(serial):
+                        expected = np.empty(1000, dtype=np.float32)
+                        generator.fill(expected, 1000)
+                        self.assertTrue(np.array_equal(data[row], expected), (names[row], dp, accumulator))
+
+    def test_generate_packet(self):
+        # The packets of the component and of Stream, generated here or by
+        # the workers
+        names = ("sine", "whitenoise")
+        serial = [self._create(name) for name in names]
+        parallel = [self._create(name) for name in names]
+        buffer = Shapes.packet_buffer(None, 2, 1000)
+        self.assertTrue(Shapes.packet_buffer(buffer, 2, 1000) is buffer)
+        self.assertEqual(Shapes.packet_buffer(buffer, 1, 1000).shape, (1, 1000))
+        for i in range(2):
+            data = Shapes.generate_packet(serial, buffer, 1000)
+            self.assertTrue(data is buffer)
+            expected = Shapes.generate_packet(parallel, buffer, 1000, self.parallel)
+            self.assertTrue(np.array_equal(data, expected))
+        single = Shapes.generate_packet(serial[:1], buffer, 1000)
+        self.assertEqual(single.shape, (1, 1000))
+        self.assertTrue(np.array_equal(single[0], Shapes.generate_packet(parallel[:1], buffer, 1000)[0]))
+
+class PlaybackTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_formats(self):
+        data = np.arange(10, dtype=np.float32)
+        raw = os.path.join(self.directory, "data.raw")
+        data.astype(np.int16).tofile(raw)
+        npy = os.path.join(self.directory, "data.npy")
+        np.save(npy, (data[0::2] + 1j*data[1::2]).astype(np.complex64))
+        blue = os.path.join(self.directory, "data.tmp")
+        stream = Stream.Stream(start=0., shape="ramp", magnitude=1000., complex_output=True, xfer_len=5)
+        with open(blue, "wb") as f:
+            Generate.write(stream, [f], 5, "blue", "short")
+        for path, kind in ((raw, "short"), (npy, "float"), (blue, "float")):
+            playback = Playback.Playback(path, kind)
+            self.assertEqual(playback.elements(2), 5)
+            expected = data if path != blue else np.repeat(np.arange(-1000, -995), 2)
+            self.assertTrue(np.array_equal(playback.scalars, expected), path)
+        self.assertRaises(ValueError, Playback.Playback, raw, "unknown")
+
+    def test_read(self):
+        path = os.path.join(self.directory, "data.raw")
+        np.arange(10, dtype=np.float32).tofile(path)
+        playback = Playback.Playback(path)
+        # Inside the file, a view of it
+        out = np.empty(6, dtype=np.float32)
+        data, position = playback.read(1, 3, 2, 1.0, out)
+        self.assertFalse(data is out)
+        self.assertFalse(data.flags.writeable)
+        self.assertEqual((data.tolist(), position), ([2., 3., 4., 5., 6., 7.], 4))
+        # Wrapping, and scaled
+        data, position = playback.read(3, 9, 1, 2.0, np.empty(9, dtype=np.float32))
+        self.assertTrue(np.array_equal(data, [6., 8., 10., 12., 14., 16., 18., 0., 2.]))
+        self.assertEqual(position, 2)
+
+class StreamTests(unittest.TestCase):
+
+    def test_packets(self):
+        stream = Stream.Stream(start=10.25, frequency=123.4, sample_rate=10000., xfer_len=100)
+        packets = [(np.array(data), t, sri) for data, t, sri in stream.packets(3)]
+        expected = Waveform.Waveform().sincos(100., 0., 0.01234, 300, 1)
+        self.assertTrue(np.max(np.abs(np.concatenate([p[0] for p in packets]) - expected)) < 1e-3)
+        self.assertEqual([(p[1].twsec, p[1].tfsec) for p in packets], [(10, 0.25), (10, 0.26), (10, 0.27)])
+        self.assertEqual(packets[0][2].streamID, "SigGen Stream")
+        self.assertEqual(packets[0][2].xdelta, 1e-4)
+
+    def test_configure(self):
+        # The phase carries on across a change of frequency
+        stream = Stream.Stream(frequency=100., sample_rate=10000., xfer_len=100)
+        first = np.array(stream.next_packet()[0][0])
+        stream.configure(frequency=250.)
+        data = stream.next_packet()[0][0]
+        engine = Waveform.Waveform()
+        self.assertTrue(np.max(np.abs(first - engine.sincos(100., 0., 0.01, 100, 1))) < 1e-3)
+        self.assertTrue(np.max(np.abs(data - engine.sincos(100., 0., 0.025, 100, 1))) < 1e-3)
+        self.assertRaises(ValueError, stream.configure, unknown=1)
+        self.assertRaises(ValueError, stream.configure, shape="unknown")
+
+    def test_channels(self):
+        stream = Stream.Stream(channels=[("sine", 100.), ("ramp", 0., 10., "ramp")], complex_output=True,
+                               chan_rf=1e6)
+        packets = list(stream.packets(2))
+        self.assertEqual([sri.streamID for data, t, sri in packets],
+                         ["SigGen Stream_0", "ramp", "SigGen Stream_0", "ramp"])
+        self.assertEqual(packets[1][2].mode, 1)
+        self.assertEqual(packets[1][2].keywords, {"CHAN_RF": 1e6})
+        self.assertEqual(len(packets[1][0]), 2000)
+        self.assertTrue(np.array_equal(packets[3][0][:4], [-10., -10., -9., -9.]))
+
+    def test_defaults(self):
+        # The defaults of the property file and of the python properties
+        self.assertEqual(Properties.read_prf()["sample_rate"], 5000.0)
+        self.assertTrue(Properties.read_prf()["throttle"] is True)
+        defaults = Stream.Stream.DEFAULTS
+        self.assertEqual((defaults["frequency"], defaults["xfer_len"]), (1000.0, 1000))
+        self.assertTrue(defaults["sri_blocking"] is False)
+        self.assertEqual(defaults["noise_engine"], "pcg64")
+        self.assertFalse("throttle" in defaults or "prefetch_depth" in defaults)
+        self.assertEqual(Stream.Channel(), ("sine", 1000.0, 100.0, ""))
+
+class PacketTests(unittest.TestCase):
+
+    def test_to_short(self):
+        # Saturated, then truncated toward zero, through the buffers given
+        data = np.array([[-40000., -1.9, 1.9, 40000.], [32767.5, -32768.5, 0.5, -0.5]], dtype=np.float32)
+        expected = [[-32768, -1, 1, 32767], [32767, -32768, 0, 0]]
+        out = np.empty((2, 4), dtype=np.int16)
+        scratch = np.empty((2, 4), dtype=np.float32)
+        self.assertTrue(Packet.to_short(data, out, scratch) is out)
+        self.assertEqual(out.tolist(), expected)
+        self.assertEqual(Packet.to_short(data.tolist()).tolist(), expected)
+        self.assertEqual(data[0, 0], -40000.)
+
+class GenerateTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _generate(self, *args):
+        path = os.path.join(self.directory, "out.tmp")
+        self.assertEqual(Generate.main(list(args) + ["--quiet", "--start", "1000", path]), 0)
+        return path
+
+    def test_raw(self):
+        path = self._generate("--shape", "ramp", "--magnitude", "10", "--xfer_len", "300", "--samples", "1000")
+        data = np.fromfile(path, dtype=np.float32)
+        self.assertTrue(np.array_equal(data, np.arange(1000) % 20 - 10))
+        path = self._generate("--magnitude", "40000", "--type", "short", "--complex_output", "true", "--samples", "10")
+        data = np.fromfile(path, dtype=np.int16)
+        expected = Stream.Stream(magnitude=40000., complex_output=True).next_packet()[0][0][:20]
+        self.assertTrue(np.array_equal(data, np.clip(expected, -32768, 32767).astype(np.int16)))
+
+    def test_blue(self):
+        path = self._generate("--format", "blue", "--type", "short", "--sample_rate", "2000", "--seconds", "1.5",
+                              "--chan_rf", "1e6")
+        with open(path, "rb") as f:
+            header = f.read(Generate.BLUE_HEADER_SIZE)
+            data = np.fromfile(f, dtype=np.int16)
+        self.assertEqual(header[:12], "BLUEEEEIEEEI")
+        self.assertEqual(struct.unpack_from("<ddi2s", header, 32), (512., 6000., 1000, "SI"))
+        self.assertEqual(struct.unpack_from("<d", header, 56)[0], 1000. + Generate.MIDAS_EPOCH)
+        self.assertEqual(header[164:164 + struct.unpack_from("<i", header, 160)[0]], "CHAN_RF=1000000.0\0")
+        self.assertEqual(struct.unpack_from("<ddi", header, 256), (0., 5e-4, 1))
+        self.assertEqual(len(data), 3000)
+
+    def test_errors(self):
+        # Errors in the options or the files are reported, not raised
+        missing = os.path.join(self.directory, "missing", "out.tmp")
+        stderr = sys.stderr
+        sys.stderr = StringIO.StringIO()
+        try:
+            self.assertEqual(Generate.main(["--shape", "unknown", "--samples", "10", missing]), 2)
+            self.assertEqual(Generate.main(["--shape", "file", "--file_path", missing, "--samples", "10", missing]), 2)
+            self.assertEqual(Generate.main(["--samples", "10", missing]), 2)
+            self.assertEqual(len(sys.stderr.getvalue().splitlines()), 3)
+        finally:
+            sys.stderr = stderr
+
+class FakeClock:
+    # Clock that only moves when slept on or told to, one tick per read
+    def __init__(self):
+        self.now = 100.0
+        self.slept = 0.0
+    def clock(self):
+        self.now += 1e-6
+        return self.now
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+class ThrottleTests(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeClock()
+        self.throttle = Throttle.Throttle(self.fake.clock, self.fake.sleep)
+
+    def test_deadlines(self):
+        # Work done between packets comes out of the wait, and the packets
+        # end on the absolute deadlines
+        start = self.fake.now
+        for i in range(1, 101):
+            if i > 1:
+                self.fake.now += 0.003
+            self.assertEqual(self.throttle.wait(1000, 1e-5), 0.0)
+            self.assertTrue(0 <= self.fake.now - (start + i*0.01) < 1e-4)
+        self.assertTrue(abs(self.fake.slept - (0.01 + 99*0.007 - 100*0.001)) < 1e-3)
+
+    def test_short_packets(self):
+        # Spins for a tenth of the packet at most, not for SPIN
+        reads = []
+        clock = self.fake.clock
+        self.throttle.clock = lambda: reads.append(1) or clock()
+        for i in range(100):
+            self.throttle.wait(10, 1e-5)
+        self.assertTrue(self.fake.slept > 0.0085)
+        self.assertTrue(len(reads) < 100*15)
+
+    def test_behind(self):
+        self.throttle.wait(1000, 1e-5)
+        slept = self.fake.slept
+        self.fake.now += 0.015
+        self.assertTrue(self.throttle.wait(1000, 1e-5) > 0.004)
+        # Catches up without sleeping
+        self.assertEqual(self.fake.slept, slept)
+        self.throttle.wait(1000, 1e-5)
+        self.assertTrue(self.fake.slept > slept)
+
+    def test_restart(self):
+        self.throttle.wait(1000, 1e-5)
+        self.fake.now += 10.0
+        self.assertTrue(self.throttle.wait(1000, 1e-5) > Throttle.Throttle.MAX_LAG)
+        # Paced from the restart, not from the first packet
+        start = self.fake.now
+        self.throttle.wait(1000, 1e-5)
+        self.assertTrue(abs(self.fake.now - start - 0.01) < 1e-5)
+
+    def test_clock_back(self):
+        # A clock going back, as time.time may, never makes a wait longer
+        # than the packet
+        self.throttle.wait(1000, 1e-5)
+        self.fake.now -= 3600.0
+        slept = self.fake.slept
+        self.assertEqual(self.throttle.wait(1000, 1e-5), 0.0)
+        self.assertTrue(self.fake.slept - slept <= 0.01)
+        for i in range(50):
+            self.throttle.wait(1000, 1e-5)
+        self.fake.now -= 0.1
+        slept = self.fake.slept
+        self.throttle.wait(1000, 1e-5)
+        self.assertTrue(self.fake.slept - slept <= 0.01)
+        # Paced from where the clock went back
+        start = self.fake.now
+        self.throttle.wait(1000, 1e-5)
+        self.assertTrue(abs(self.fake.now - start - 0.01) < 1e-5)
+
+    def test_rate_change(self):
+        start = self.fake.now
+        self.throttle.wait(1000, 1e-5)
+        self.throttle.wait(1000, 2e-5)
+        self.assertTrue(abs(self.fake.now - (start + 0.01 + 0.02)) < 1e-5)
+
+class Time:
+    # Stands in for BULKIO.PrecisionUTCTime
+    def __init__(self, twsec, tfsec):
+        self.twsec = twsec
+        self.tfsec = tfsec
+
+class SampleClockTests(unittest.TestCase):
+
+    def test_integral_rate(self):
+        # A day at 10 Msps lands exactly on the second
+        clock = SampleClock.SampleClock(Time(1000.0, 0.25), 10e6)
+        t = clock.time(86400*10000000 + 5000000)
+        self.assertEqual((t.twsec, t.tfsec), (1000.0 + 86400, 0.75))
+        t = clock.time(7500000)
+        self.assertEqual((t.twsec, t.tfsec), (1001.0, 0.0))
+
+    def test_fractional_rate(self):
+        # No drift against the exact time after a billion elements
+        rate = 48000.0/1.001
+        clock = SampleClock.SampleClock(Time(0.0, 0.0), rate)
+        for i in range(1000):
+            clock.advance(1000000)
+        t = clock.time()
+        self.assertTrue(abs(t.twsec + t.tfsec - 1e9/rate) < 1e-9)
+        self.assertTrue(0.0 <= t.tfsec < 1.0)
+
+    def test_rate_change(self):
+        clock = SampleClock.SampleClock(Time(10.0, 0.5), 1000.0)
+        clock.advance(1500)
+        clock.set_rate(100.0)
+        clock.advance(50)
+        t = clock.time()
+        self.assertEqual((t.twsec, t.tfsec), (12.0, 0.5))
+
+    def test_times(self):
+        clock = SampleClock.SampleClock(Time(0.0, 0.0), 4.0)
+        stamps = clock.times([1, 2, 3, 4])
+        self.assertEqual([s.twsec + s.tfsec for s in stamps], [0.0, 0.25, 0.75, 1.5])
+        self.assertEqual(clock.count, 10)
+        # The start time is not changed
+        self.assertEqual(clock.start.tfsec, 0.0)
+
+if __name__ == "__main__":
+    unittest.main()